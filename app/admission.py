@@ -0,0 +1,45 @@
+import threading
+import time
+from fastapi import HTTPException, status
+
+
+class AdmissionController:
+    """
+    Sheds load when the DB pool is saturated. `get_db` reports how long each
+    request waited for a connection; while the smoothed wait is above the
+    threshold, new requests are turned away with a 503 instead of queueing
+    behind the pool. Rejected requests don't report a wait, so once
+    `recovery_seconds` pass without samples traffic is let through again.
+    """
+
+    def __init__(
+        self, threshold_ms: float, alpha: float = 0.2, recovery_seconds: float = 1.0
+    ):
+        self.threshold = threshold_ms / 1000
+        self.alpha = alpha
+        self.recovery_seconds = recovery_seconds
+        self.pool_wait = 0.0
+        self._last_sample = 0.0
+        self._lock = threading.Lock()
+
+    def record_pool_wait(self, seconds: float):
+        with self._lock:
+            self.pool_wait = self.alpha * seconds + (1 - self.alpha) * self.pool_wait
+            self._last_sample = time.monotonic()
+
+    def is_overloaded(self) -> bool:
+        if self.pool_wait <= self.threshold:
+            return False
+        if time.monotonic() - self._last_sample > self.recovery_seconds:
+            # * stale reading, let requests probe the pool again
+            self.pool_wait = self.threshold
+            return False
+        return True
+
+    def admit(self):
+        if self.is_overloaded():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
@@ -0,0 +1,132 @@
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+from . import models, notifications
+from .database import SessionLocal, engine
+from .partitions import ensure_partitions, session_bounds, session_year
+
+CHUNK_SIZE = 1000
+
+
+def _row(complaint, assignment, rating) -> dict:
+    return {
+        "id": complaint.id,
+        "student_id": complaint.student_id,
+        "category_id": complaint.category_id,
+        "priority_id": complaint.priority_id,
+        "title": complaint.title,
+        "description": complaint.description,
+        "file_url": complaint.file_url,
+        "status": complaint.status,
+        "closed_by": complaint.closed_by,
+        "created_at": complaint.created_at.isoformat(),
+        "assignment": assignment
+        and {
+            "staff_id": assignment.staff_id,
+            "status": assignment.status,
+            "response": assignment.response,
+            "assigned_at": assignment.assigned_at
+            and assignment.assigned_at.isoformat(),
+            "resolved_at": assignment.resolved_at
+            and assignment.resolved_at.isoformat(),
+        },
+        "rating": rating and {"rating": rating.rating, "feedback": rating.feedback},
+    }
+
+
+def _delete(db: Session, complaint_ids: list[str], start: datetime, end: datetime):
+    db.query(models.Rating).filter(
+        models.Rating.complaint_id.in_(complaint_ids)
+    ).delete(synchronize_session=False)
+    notifications.delete_for_complaints(db, complaint_ids)
+    db.query(models.ComplaintEvent).filter(
+        models.ComplaintEvent.complaint_id.in_(complaint_ids)
+    ).delete(synchronize_session=False)
+    db.query(models.ComplaintAssignment).filter(
+        models.ComplaintAssignment.complaint_id.in_(complaint_ids)
+    ).delete(synchronize_session=False)
+    # * the created_at bounds let Postgres prune to the session's partition
+    db.query(models.Complaint).filter(
+        models.Complaint.id.in_(complaint_ids),
+        models.Complaint.created_at >= start,
+        models.Complaint.created_at < end,
+    ).delete(synchronize_session=False)
+
+
+def archive_session(db: Session, year: int, output_dir: str) -> int:
+    """
+    Exports the resolved complaints of a session, with their assignment and
+    rating, to a gzipped JSONL file and deletes them from the hot tables.
+    """
+    start, end = session_bounds(year)
+    rows = (
+        db.query(models.Complaint, models.ComplaintAssignment, models.Rating)
+        .outerjoin(
+            models.ComplaintAssignment,
+            models.ComplaintAssignment.complaint_id == models.Complaint.id,
+        )
+        .outerjoin(models.Rating, models.Rating.complaint_id == models.Complaint.id)
+        .filter(models.Complaint.created_at >= start)
+        .filter(models.Complaint.created_at < end)
+        .filter(models.Complaint.status == "resolved")
+        .yield_per(CHUNK_SIZE)
+    )
+
+    path = os.path.join(output_dir, f"complaints_{year}_{year + 1}.jsonl.gz")
+    archived = []
+    with gzip.open(path, "at") as output:
+        for complaint, assignment, rating in rows:
+            output.write(json.dumps(_row(complaint, assignment, rating)) + "\n")
+            archived.append(complaint.id)
+
+    for index in range(0, len(archived), CHUNK_SIZE):
+        _delete(db, archived[index : index + CHUNK_SIZE], start, end)
+    db.commit()
+    return len(archived)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive resolved complaints from old academic sessions"
+    )
+    parser.add_argument("--keep-sessions", type=int, default=2)
+    parser.add_argument("--output-dir", default="archive")
+    parser.add_argument(
+        "--partitions-only",
+        action="store_true",
+        help="only create the current and next session's partitions",
+    )
+    args = parser.parse_args()
+
+    current = session_year(datetime.now(timezone.utc))
+
+    # * create next session's partitions before any rows need them
+    with engine.begin() as connection:
+        ensure_partitions(connection, current, current + 1)
+    if args.partitions_only:
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    oldest = current - args.keep_sessions
+    db = SessionLocal()
+    try:
+        first = (
+            db.query(models.Complaint.created_at)
+            .order_by(models.Complaint.created_at)
+            .first()
+        )
+        if not first:
+            return
+        for year in range(session_year(first[0]), oldest + 1):
+            count = archive_session(db, year, args.output_dir)
+            print(f"Archived {count} complaints from {year}/{year + 1}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # * python -m app.archive --keep-sessions 2 --output-dir archive
+    main()
@@ -0,0 +1,283 @@
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Callable
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SharedTier:
+    """
+    Redis tier shared by every worker. Invalidations are also published so
+    the other workers drop their local copies, and bump the key's generation
+    so a load that started before the invalidation, in any worker, can't
+    write its rows back.
+    """
+
+    CHANNEL = "cache:invalidate"
+    # * only has to outlive the slowest load
+    GENERATION_TTL = 24 * 60 * 60
+
+    SET_IF_CURRENT = """
+    if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    end
+    """
+
+    def __init__(self, url: str, ttl: int):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self._set_if_current = self.client.register_script(self.SET_IF_CURRENT)
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(f"cache:{key}")
+
+    def generation(self, key: str) -> str:
+        """Read before loading, and passed back to `set`."""
+        return (self.client.get(f"cache:gen:{key}") or b"0").decode()
+
+    def set(self, key: str, value: bytes, generation: str):
+        self._set_if_current(
+            keys=[f"cache:{key}", f"cache:gen:{key}"],
+            args=[generation, value, self.ttl],
+        )
+
+    def invalidate(self, keys: list[str]):
+        pipeline = self.client.pipeline()
+        for key in keys:
+            pipeline.incr(f"cache:gen:{key}")
+            pipeline.expire(f"cache:gen:{key}", self.GENERATION_TTL)
+        pipeline.delete(*[f"cache:{key}" for key in keys])
+        pipeline.publish(self.CHANNEL, "\n".join(keys))
+        pipeline.execute()
+
+    def subscribe(self, callback: Callable[[list[str]], None]):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(
+            **{
+                self.CHANNEL: lambda message: callback(
+                    message["data"].decode().split("\n")
+                )
+            }
+        )
+        pubsub.run_in_thread(daemon=True, sleep_time=1)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class TieredCache:
+    """
+    Read-through cache with an in-process LRU in front of an optional shared
+    tier. Concurrent misses on the same key share a single load, and a load
+    that overlaps an invalidation of its key isn't cached.
+    """
+
+    def __init__(
+        self,
+        adapter: TypeAdapter,
+        local_size: int,
+        local_ttl: int,
+        shared: SharedTier | None = None,
+    ):
+        self.adapter = adapter
+        self.local = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self.shared = shared
+        self.metrics: Counter = Counter()
+        self._generations: dict[str, int] = {}
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._subscribed_pid: int | None = None
+
+    def _subscribe(self):
+        # * per process, the listener thread doesn't survive a preload fork
+        with self._lock:
+            if self._subscribed_pid == os.getpid():
+                return
+            self._subscribed_pid = os.getpid()
+        self.shared.subscribe(self._drop_local)
+
+    def get_or_load(self, key: str, loader: Callable):
+        if self.shared and self._subscribed_pid != os.getpid():
+            self._subscribe()
+
+        with self._lock:
+            if key in self.local:
+                self.metrics["local_hits"] += 1
+                return self.local[key]
+
+        if self.shared:
+            try:
+                cached = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable: {str(e)}")
+                cached = None
+            if cached is not None:
+                value = self.adapter.validate_json(cached)
+                with self._lock:
+                    self.metrics["shared_hits"] += 1
+                    self.local[key] = value
+                return value
+
+        return self._load(key, loader)
+
+    def _load(self, key: str, loader: Callable):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = self._generations.get(key, 0)
+            self.metrics["misses" if leader else "coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        shared_generation = None
+        if self.shared:
+            try:
+                shared_generation = self.shared.generation(key)
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable: {str(e)}")
+
+        try:
+            flight.result = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                fresh = self._generations.get(key, 0) == generation
+                if flight.error is None and fresh:
+                    self.local[key] = flight.result
+            flight.done.set()
+
+        if fresh and shared_generation is not None:
+            try:
+                self.shared.set(
+                    key, self.adapter.dump_json(flight.result), shared_generation
+                )
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable: {str(e)}")
+        return flight.result
+
+    def _drop_local(self, keys: list[str]):
+        with self._lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self.local.pop(key, None)
+
+    def invalidate(self, *keys: str):
+        keys = [key for key in dict.fromkeys(keys) if key]
+        if not keys:
+            return
+        self._drop_local(keys)
+        with self._lock:
+            self.metrics["invalidations"] += len(keys)
+        if self.shared:
+            try:
+                self.shared.invalidate(keys)
+            except Exception as e:
+                logger.warning(f"Shared cache unavailable: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["local_entries"] = len(self.local)
+        lookups = sum(
+            stats.get(name, 0)
+            for name in ("local_hits", "shared_hits", "misses", "coalesced")
+        )
+        hits = stats.get("local_hits", 0) + stats.get("shared_hits", 0)
+        stats["hit_ratio"] = hits / lookups if lookups else 0.0
+        return stats
+
+
+def student_key(student_id: int) -> str:
+    return f"student:{student_id}"
+
+
+def staff_key(staff_id: int | None) -> str | None:
+    return f"staff:{staff_id}" if staff_id else None
+
+
+def hall_key(hall_name: str | None) -> str | None:
+    return f"hall:{hall_name}" if hall_name else None
+
+
+def department_key(department: str | None) -> str | None:
+    return f"department:{department}" if department else None
+
+
+def staff_scope_key(staff: schemas.StaffPrincipal) -> str:
+    """Key of the list `get_all_complaints` shows this staff member."""
+    if staff.department == "Hall":
+        return hall_key(staff.hall_name)
+    return department_key(staff.department)
+
+
+def complaint_keys(db: Session, complaint_id: str) -> list[str]:
+    """
+    Every cached list a complaint, or a duplicate linked to it, appears in.
+    """
+    rows = (
+        db.query(
+            models.Complaint.student_id,
+            models.Student.hallname,
+            models.Student.department,
+            models.ComplaintAssignment.staff_id,
+        )
+        .join(models.Student, models.Student.id == models.Complaint.student_id)
+        .outerjoin(
+            models.ComplaintAssignment,
+            models.ComplaintAssignment.complaint_id == models.Complaint.id,
+        )
+        .filter(
+            or_(
+                models.Complaint.id == complaint_id,
+                models.Complaint.parent_id == complaint_id,
+            )
+        )
+        .all()
+    )
+    keys = []
+    for student_id, hall_name, department, staff_id in rows:
+        keys += [
+            student_key(student_id),
+            hall_key(hall_name),
+            department_key(department),
+            staff_key(staff_id),
+        ]
+    return keys
+
+
+def _shared_tier() -> SharedTier | None:
+    if not settings.cache_redis_url:
+        return None
+    return SharedTier(settings.cache_redis_url, settings.complaint_cache_ttl_seconds)
+
+
+# * cached complaint lists, keyed by student, staff member, hall or department
+complaint_lists = TieredCache(
+    TypeAdapter(list[schemas.Complaints]),
+    local_size=settings.complaint_cache_local_size,
+    local_ttl=settings.complaint_cache_local_ttl_seconds,
+    shared=_shared_tier(),
+)
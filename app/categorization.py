@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable
+from cachetools import LRUCache
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# * 1 - Hall, 2 - Course, 3 - Bursary
+HALL = 1
+COURSE = 2
+BURSARY = 3
+CATEGORY_IDS = frozenset({HALL, COURSE, BURSARY})
+
+
+def is_valid(result: dict | None) -> bool:
+    """Only results naming one of the known categories may be used."""
+    category_id = result.get("category_id") if isinstance(result, dict) else None
+    return type(category_id) is int and category_id in CATEGORY_IDS
+
+
+def normalize(title: str, description: str) -> str:
+    text = f"{title} {description}".lower()
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", text)).strip()
+
+
+def cache_key(title: str, description: str) -> str:
+    return hashlib.sha256(normalize(title, description).encode()).hexdigest()
+
+
+class CategorizationBackend(ABC):
+    """Classifies a batch of (title, description) pairs in a single call."""
+
+    @abstractmethod
+    def categorize_batch(self, complaints: list[tuple[str, str]]) -> list[dict]:
+        raise NotImplementedError
+
+
+class KeywordBackend(CategorizationBackend):
+    """Deterministic local classifier, used in tests and when no LLM is set up."""
+
+    KEYWORDS = {
+        HALL: {"hall", "hostel", "room", "water", "light", "porter", "bed", "toilet"},
+        COURSE: {"course", "registration", "lecture", "exam", "result", "upload"},
+        BURSARY: {"fee", "fees", "payment", "bursary", "receipt", "refund", "paid"},
+    }
+
+    def categorize_batch(self, complaints: list[tuple[str, str]]) -> list[dict]:
+        results = []
+        for title, description in complaints:
+            words = set(normalize(title, description).split())
+            hits = {
+                category_id: len(words & keywords)
+                for category_id, keywords in self.KEYWORDS.items()
+            }
+            category_id = max(hits, key=hits.get)
+            total = sum(hits.values())
+            results.append(
+                {
+                    "category_id": category_id,
+                    "confidence": hits[category_id] / total if total else 0.0,
+                    "reasoning": "Keyword match",
+                }
+            )
+        return results
+
+
+class GeminiBackend(CategorizationBackend):
+    PROMPT = """
+    Categorize each of these student complaints into one of these categories:
+    1. Hall (issues related to student accommodation, facilities, or hall management)
+    2. Course (academic issues, registration, course materials, or lectures)
+    3. Bursary (financial matters, fees, or payments)
+
+    Complaints:
+    {complaints}
+
+    Respond with a JSON array holding one object per complaint, in order:
+    [{{"category_id": 1, "confidence": 0.9, "reasoning": "brief explanation"}}]
+    """
+
+    def __init__(self):
+        self._model = None
+
+    @property
+    def model(self):
+        # * configure the SDK and build the model once per process
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=settings.gemini_api_key)
+            self._model = genai.GenerativeModel(
+                "gemini-2.0-flash",
+                generation_config={"response_mime_type": "application/json"},
+            )
+        return self._model
+
+    def categorize_batch(self, complaints: list[tuple[str, str]]) -> list[dict]:
+        listing = "\n".join(
+            f"{index}. Title: {title}\n   Description: {description}"
+            for index, (title, description) in enumerate(complaints, start=1)
+        )
+        response = self.model.generate_content(self.PROMPT.format(complaints=listing))
+        results = json.loads(response.text)
+        if len(results) != len(complaints):
+            raise ValueError("Model returned a different number of results")
+        return results
+
+
+def get_backend() -> CategorizationBackend:
+    if settings.categorization_backend == "gemini":
+        return GeminiBackend()
+    return KeywordBackend()
+
+
+# * handlers get the ids of the complaints waiting on a result and its category
+Handler = Callable[[list[str], int], None]
+
+
+class CategorizationService:
+    """
+    Categorizes complaints off the request path. `lookup` only ever reads the
+    cache; `submit` queues a complaint and a background thread sends whatever
+    arrives within `window_ms` to the backend as one batch, then hands each
+    result to the `on_categorized` handlers.
+    """
+
+    def __init__(
+        self,
+        backend: CategorizationBackend,
+        window_ms: int,
+        max_batch: int,
+        cache_size: int = 10_000,
+    ):
+        self.backend = backend
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache = LRUCache(maxsize=cache_size)
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: dict[str, list[str]] = {}
+        self.handlers: list[Handler] = []
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    def lookup(self, title: str, description: str) -> dict | None:
+        with self._lock:
+            return self.cache.get(cache_key(title, description))
+
+    def submit(self, complaint_id: str, title: str, description: str):
+        key = cache_key(title, description)
+        with self._lock:
+            # * identical text already queued, share its result
+            if key in self._pending:
+                self._pending[key].append(complaint_id)
+                return
+            self._pending[key] = [complaint_id]
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._queue.put((key, title, description))
+
+    def _next_batch(self) -> list[tuple[str, str, str]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                results = self.backend.categorize_batch(
+                    [(title, description) for _, title, description in batch]
+                )
+            except Exception as e:
+                logger.error(f"Complaint categorization failed: {str(e)}")
+                results = [None] * len(batch)
+
+            with self._lock:
+                waiting = [self._pending.pop(key, []) for key, _, _ in batch]
+                for (key, _, _), result in zip(batch, results):
+                    if is_valid(result):
+                        self.cache[key] = result
+
+            for result, complaint_ids in zip(results, waiting):
+                if result is None:
+                    continue
+                if not is_valid(result):
+                    logger.warning(f"Ignoring unknown category in {result!r}")
+                    continue
+                self._apply(complaint_ids, result["category_id"])
+
+    def _apply(self, complaint_ids: list[str], category_id: int):
+        for handler in self.handlers:
+            try:
+                handler(complaint_ids, category_id)
+            except Exception as e:
+                logger.error(f"Applying category {category_id} failed: {str(e)}")
+
+
+service = CategorizationService(
+    backend=get_backend(),
+    window_ms=settings.categorization_batch_window_ms,
+    max_batch=settings.categorization_max_batch,
+)
+
+
+def on_categorized(handler: Handler) -> Handler:
+    service.handlers.append(handler)
+    return handler
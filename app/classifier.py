@@ -0,0 +1,219 @@
+import logging
+import os
+import sys
+import numpy as np
+from sqlalchemy.orm import Session
+from . import models
+from .categorization import normalize
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(title: str, description: str) -> list[str]:
+    words = normalize(title, description).split()
+    # * unigrams plus bigrams so "school fees" and "course registration" count
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def platt(margins: np.ndarray, correct: np.ndarray) -> np.ndarray:
+    """
+    Fits P(correct) = sigmoid(a * margin + b) by Newton's method, with Platt's
+    smoothed targets so a perfectly separated sample doesn't diverge.
+    """
+    if not margins.size:
+        return np.zeros(2)
+    positives = correct.sum()
+    negatives = correct.size - positives
+    targets = np.where(correct, (positives + 1) / (positives + 2), 1 / (negatives + 2))
+    features = np.column_stack([margins, np.ones_like(margins)])
+    params = np.zeros(2)
+    for _ in range(100):
+        probabilities = 1 / (1 + np.exp(-features @ params))
+        gradient = features.T @ (probabilities - targets)
+        curvature = probabilities * (1 - probabilities)
+        hessian = features.T @ (features * curvature[:, None]) + 1e-6 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        params -= step
+        if np.abs(step).max() < 1e-9:
+            break
+    return params
+
+
+class ComplaintClassifier:
+    """
+    TF-IDF nearest-centroid classifier. Each category is the mean of its
+    L2-normalized TF-IDF rows, so predicting is a single gather and dot
+    product over the complaint's tokens. Confidence is the margin between the
+    two best categories, mapped to the chance of being right by a sigmoid fit
+    on held-out folds.
+    """
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        idf: np.ndarray,
+        centroids: np.ndarray,
+        classes: np.ndarray,
+        calibration: np.ndarray | None = None,
+    ):
+        if len(classes) < 2:
+            raise ValueError("The classifier needs at least two categories")
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.centroids = centroids
+        self.classes = classes
+        # * (a, b) of sigmoid(a * margin + b); uncalibrated models are never confident
+        self.calibration = np.zeros(2) if calibration is None else calibration
+
+    def _vectorize(self, tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        indices = [
+            self.vocabulary[token] for token in tokens if token in self.vocabulary
+        ]
+        if not indices:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        columns, counts = np.unique(np.array(indices), return_counts=True)
+        weights = counts * self.idf[columns]
+        return columns, weights / np.linalg.norm(weights)
+
+    @classmethod
+    def _fit_centroids(cls, texts: list[tuple[str, str]], labels: list[int]):
+        documents = [tokenize(title, description) for title, description in texts]
+        vocabulary: dict[str, int] = {}
+        for tokens in documents:
+            for token in tokens:
+                vocabulary.setdefault(token, len(vocabulary))
+
+        document_frequency = np.zeros(len(vocabulary))
+        for tokens in documents:
+            document_frequency[[vocabulary[token] for token in set(tokens)]] += 1
+        idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+
+        classes = np.array(sorted(set(labels)))
+        class_index = {label: index for index, label in enumerate(classes)}
+        centroids = np.zeros((len(classes), len(vocabulary)))
+        model = cls(vocabulary, idf, centroids, classes)
+        for tokens, label in zip(documents, labels):
+            columns, weights = model._vectorize(tokens)
+            centroids[class_index[label], columns] += weights
+
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        model.centroids = centroids / np.where(norms == 0, 1, norms)
+        return model
+
+    @classmethod
+    def fit(cls, texts: list[tuple[str, str]], labels: list[int], folds: int = 5):
+        model = cls._fit_centroids(texts, labels)
+
+        # * calibrate on margins of complaints each fold's model hasn't seen
+        margins, correct = [], []
+        for fold in range(folds):
+            held_out = range(fold, len(texts), folds)
+            train = [index for index in range(len(texts)) if index % folds != fold]
+            if len({labels[index] for index in train}) < 2:
+                continue
+            fold_model = cls._fit_centroids(
+                [texts[index] for index in train], [labels[index] for index in train]
+            )
+            for index in held_out:
+                category_id, margin = fold_model._rank(*texts[index])
+                if category_id is not None:
+                    margins.append(margin)
+                    correct.append(category_id == labels[index])
+
+        model.calibration = platt(np.array(margins), np.array(correct, dtype=bool))
+        return model
+
+    def _rank(self, title: str, description: str) -> tuple[int | None, float]:
+        columns, weights = self._vectorize(tokenize(title, description))
+        if not columns.size:
+            return None, 0.0
+        scores = self.centroids[:, columns] @ weights
+        second, best = np.argsort(scores)[-2:]
+        return int(self.classes[best]), float(scores[best] - scores[second])
+
+    def predict(self, title: str, description: str) -> dict:
+        category_id, margin = self._rank(title, description)
+        if category_id is None:
+            return {"category_id": None, "confidence": 0.0}
+
+        a, b = self.calibration
+        return {
+            "category_id": category_id,
+            "confidence": float(1 / (1 + np.exp(-(a * margin + b)))),
+            "reasoning": "Local classifier",
+        }
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            tokens=np.array(list(self.vocabulary)),
+            idf=self.idf,
+            centroids=self.centroids,
+            classes=self.classes,
+            calibration=self.calibration,
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        data = np.load(path)
+        if "calibration" not in data:
+            raise ValueError("Model predates confidence calibration, retrain it")
+        tokens = data["tokens"].tolist()
+        vocabulary = {token: index for index, token in enumerate(tokens)}
+        return cls(
+            vocabulary,
+            data["idf"],
+            data["centroids"],
+            data["classes"],
+            data["calibration"],
+        )
+
+
+def train_from_db(db: Session) -> ComplaintClassifier:
+    rows = db.query(
+        models.Complaint.title,
+        models.Complaint.description,
+        models.Complaint.category_id,
+    ).all()
+    return ComplaintClassifier.fit(
+        [(title, description) for title, description, _ in rows],
+        [category_id for _, _, category_id in rows],
+    )
+
+
+def load_classifier() -> ComplaintClassifier | None:
+    if not os.path.exists(settings.classifier_model_path):
+        logger.info("No complaint classifier found, deferring to the LLM")
+        return None
+    try:
+        return ComplaintClassifier.load(settings.classifier_model_path)
+    except ValueError as e:
+        logger.warning(f"Complaint classifier not loaded, deferring to the LLM: {e}")
+        return None
+
+
+classifier = load_classifier()
+
+
+def retrain():
+    """Rebuilds the classifier from the complaints table and saves it."""
+    db = SessionLocal()
+    try:
+        model = train_from_db(db)
+    finally:
+        db.close()
+    model.save(settings.classifier_model_path)
+    print(
+        f"Trained on {len(model.classes)} categories, "
+        f"{len(model.vocabulary)} terms -> {settings.classifier_model_path}"
+    )
+
+
+if __name__ == "__main__":
+    # * python -m app.classifier retrain
+    if sys.argv[1:] == ["retrain"]:
+        retrain()
+    else:
+        print("usage: python -m app.classifier retrain")
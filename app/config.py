@@ -7,17 +7,89 @@ class Settings(BaseSettings):
     database_password: str
     database_name: str
     database_username: str
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_replica_hostnames: list[str] = []
+    replica_max_lag_seconds: float = 5.0
+    replica_connect_timeout_seconds: int = 2
+    read_your_writes_seconds: float = 10.0
     secret_key: str
     algorithm: str
     access_token_expiration_minutes: int
+    refresh_token_expiration_days: int = 7
+    # * kid -> PEM key. When set, tokens are signed with the active kid's
+    # * private key and verified with the matching public key.
+    jwt_private_keys: dict[str, str] = {}
+    jwt_public_keys: dict[str, str] = {}
+    jwt_active_kid: str | None = None
+    jwt_asymmetric_algorithm: str = "RS256"
+    # * how stale a worker's copy of the logout-everywhere cut-offs may get
+    token_revocation_sync_seconds: float = 5.0
+    # * role names allowed to export everything and run bulk imports
+    admin_roles: list[str] = ["hadmin"]
     google_client_id: str
     google_client_secret: str
     cloudinary_cloud_name: str
     cloudinary_api_key: str
     cloudinary_secret_key: str
+    storage_backend: str = "cloudinary"  # cloudinary, local, s3
+    # * base URL stored files are served from, for local storage this API's URL
+    storage_public_url: str | None = None
+    local_storage_path: str = "uploads"
+    # * set when nginx serves local_storage_path from an internal location
+    local_storage_accel_redirect_prefix: str | None = None
+    # * largest file accepted by direct uploads to local storage
+    local_storage_max_upload_bytes: int = 10 * 1024 * 1024
+    s3_bucket: str | None = None
+    s3_endpoint_url: str | None = None  # e.g. a MinIO server
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    s3_region: str = "us-east-1"
     mailgun_api_key: str
     novu_secret_key: str
     gemini_api_key: str
+    rate_limit_redis_url: str | None = None
+    admission_pool_wait_threshold_ms: int = 200
+    idempotency_ttl_seconds: int = 24 * 60 * 60
+    idempotency_lock_seconds: int = 60
+    categorization_backend: str = "gemini"  # gemini, keyword
+    categorization_batch_window_ms: int = 200
+    categorization_max_batch: int = 16
+    classifier_model_path: str = "complaint_classifier.npz"
+    classifier_confidence_threshold: float = 0.7
+    duplicate_similarity_threshold: float = 0.6
+    duplicate_window_hours: int = 48
+    # * scores shrink towards rating_prior_mean as if every staff member
+    # * started with rating_prior_weight ratings of that value
+    rating_prior_mean: float = 3.0
+    rating_prior_weight: int = 5
+    # * open complaints one point of score is worth when assigning, 0 disables
+    assignment_score_weight: float = 0.0
+
+    escalation_tree_refresh_seconds: int = 300
+    routing_rules_refresh_seconds: int = 300
+    # * bulk staff and student imports
+    bulk_import_max_rows: int = 10_000
+    password_hash_workers: int | None = None  # defaults to one per CPU
+    # * how long a complaint claimed from the work queue stays hidden from it
+    queue_lease_seconds: int = 15 * 60
+    # * complaint list cache, the shared tier is used when a Redis URL is set
+    cache_redis_url: str | None = None
+    complaint_cache_ttl_seconds: int = 300
+    complaint_cache_local_size: int = 10_000
+    # * bounds staleness on other workers if an invalidation message is missed
+    complaint_cache_local_ttl_seconds: int = 10
+    # * production server, see app/server.py
+    port: int = 8080
+    web_concurrency: int | None = None  # workers, defaults to 2 x CPUs + 1
+    # * Postgres max_connections and how many to leave for migrations and admin
+    database_max_connections: int = 100
+    database_reserved_connections: int = 10
+    graceful_timeout_seconds: int = 30
+    # * proxies whose X-Forwarded-For/-Proto are trusted, "*" behind a platform
+    # * router such as Heroku's that every request passes through
+    forwarded_allow_ips: str = "127.0.0.1"
+    max_requests_per_worker: int = 5000
 
     model_config = {
         "env_file": ".env",
@@ -1,19 +1,180 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from .admission import AdmissionController
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}/{settings.database_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+admission = AdmissionController(threshold_ms=settings.admission_pool_wait_threshold_ms)
+
+
+# * set on responses to clients that committed, as a unix timestamp
+LAST_WRITE_COOKIE = "last_write"
+
+
+class ReplicaRouter:
+    """
+    Picks the engine for read-only requests. Replicas are used round-robin,
+    skipping any whose replay lag is over `max_lag_seconds`, and a client that
+    committed a write within `sticky_seconds` keeps reading from the primary
+    so it always sees its own writes. The client carries the time of its last
+    write in a cookie, so this holds whichever worker serves the read.
+
+    Replica lag is checked every `lag_check_seconds` by a background thread,
+    so requests never wait on a replica connection.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: list[Engine],
+        max_lag_seconds: float,
+        sticky_seconds: float,
+        lag_check_seconds: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.lag_check_seconds = lag_check_seconds
+        # * nothing is trusted until the first check has run
+        self._healthy: list[Engine] = []
+        self._cycle = itertools.cycle(self._healthy)
+        self._watcher: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _replica_lag(self, replica: Engine) -> float:
+        with replica.connect() as connection:
+            lag = connection.execute(
+                text(
+                    "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+                )
+            ).scalar()
+        return float(lag or 0)
+
+    def _refresh_health(self):
+        healthy = []
+        for replica in self.replicas:
+            try:
+                if self._replica_lag(replica) <= self.max_lag_seconds:
+                    healthy.append(replica)
+            except Exception as e:
+                logger.warning(f"Replica {replica.url.host} unavailable: {str(e)}")
+        with self._lock:
+            self._healthy = healthy
+            self._cycle = itertools.cycle(healthy)
+
+    def _watch(self):
+        while True:
+            self._refresh_health()
+            time.sleep(self.lag_check_seconds)
+
+    def is_sticky(self, last_write: float | None) -> bool:
+        """Whether a write at `last_write` may not have reached the replicas yet."""
+        return (
+            bool(self.replicas)
+            and last_write is not None
+            and abs(time.time() - last_write) < self.sticky_seconds
+        )
+
+    def read_engine(self, last_write: float | None) -> Engine:
+        if not self.replicas or self.is_sticky(last_write):
+            return self.primary
+
+        with self._lock:
+            # * started on first use so each forked worker runs its own
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+            if not self._healthy:
+                return self.primary
+            return next(self._cycle)
+
+
+def _replica_url(hostname: str) -> str:
+    return f"postgresql://{settings.database_username}:{settings.database_password}@{hostname}/{settings.database_name}"
+
+
+replica_router = ReplicaRouter(
+    primary=engine,
+    replicas=[
+        create_engine(
+            _replica_url(hostname),
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            connect_args={"connect_timeout": settings.replica_connect_timeout_seconds},
+        )
+        for hostname in settings.database_replica_hostnames
+    ],
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    sticky_seconds=settings.read_your_writes_seconds,
+)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_commit(session):
+    # * picked up by LastWriteMiddleware, which sets the cookie
+    state = session.info.get("request_state")
+    if state is not None:
+        state.last_write = time.time()
+
+
+def _last_write(request: Request) -> float | None:
+    try:
+        return float(request.cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_db(request: Request):
+    admission.admit()
+    db = SessionLocal(info={"request_state": request.state})
+    try:
+        # * check out the connection up front so pool wait time can be measured
+        start = time.perf_counter()
+        db.connection()
+        admission.record_pool_wait(time.perf_counter() - start)
+        yield db
+    finally:
+        db.close()
+
+
+def open_read_session(request: Request):
+    """Session for read-only work, served by a replica when possible."""
+    return SessionLocal(bind=replica_router.read_engine(_last_write(request)))
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Whether the client committed a write the replicas may not have yet. Such
+    reads skip shared caches, which another client may have refilled from a
+    lagging replica after the write invalidated them.
+    """
+    return replica_router.is_sticky(_last_write(request))
+
 
-def get_db():
-    db = SessionLocal()
+def get_read_db(request: Request):
+    admission.admit()
+    db = open_read_session(request)
     try:
         yield db
     finally:
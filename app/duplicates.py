@@ -0,0 +1,174 @@
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .categorization import BURSARY, COURSE, HALL, normalize
+from .config import settings
+
+_PRIME = np.uint64(4294967311)
+# * complaints commit a little after their created_at, so syncs overlap
+_SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def duplicate_scope(category_id: int, student: schemas.StudentPrincipal) -> str:
+    """Complaints are only compared with others from the same hall/department."""
+    if category_id == HALL:
+        return f"hall:{student.hallname}"
+    if category_id == COURSE:
+        return f"department:{student.department}"
+    if category_id == BURSARY:
+        return "bursary"
+    return f"category:{category_id}"
+
+
+class MinHashIndex:
+    """
+    MinHash/LSH index over recent open complaints. Signatures are split into
+    `bands`; two complaints sharing any band are candidates and the closest
+    candidate above `threshold` estimated Jaccard similarity is the duplicate.
+    Entries older than `window_hours` are dropped.
+
+    Each worker holds its own copy. `sync` pulls the open complaints other
+    workers took since the last call before every lookup, and callers check a
+    candidate parent is still open in the database before linking to it, so
+    a parent closed elsewhere is never used.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = 0.6,
+        window_hours: int = 48,
+        seed: int = 1,
+    ):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window = window_hours * 60 * 60
+        self._buckets: dict[tuple, list[str]] = {}
+        self._signatures: dict[str, tuple[str, np.ndarray]] = {}
+        self._expiry: deque = deque()
+        self._synced_until: datetime | None = None
+        self._lock = threading.Lock()
+
+    def signature(self, title: str, description: str) -> np.ndarray:
+        words = normalize(title, description).split()
+        shingles = {" ".join(words[i : i + 2]) for i in range(max(1, len(words) - 1))}
+        hashes = np.array(
+            [zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.uint64
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % _PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, scope: str, signature: np.ndarray) -> list[tuple]:
+        return [
+            (
+                scope,
+                band,
+                signature[band * self.rows : (band + 1) * self.rows].tobytes(),
+            )
+            for band in range(self.bands)
+        ]
+
+    def _evict(self, now: float):
+        while self._expiry and self._expiry[0][0] < now:
+            _, complaint_id = self._expiry.popleft()
+            self._remove(complaint_id)
+
+    def _remove(self, complaint_id: str):
+        entry = self._signatures.pop(complaint_id, None)
+        if not entry:
+            return
+        scope, signature = entry
+        for key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if bucket and complaint_id in bucket:
+                bucket.remove(complaint_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def add(
+        self,
+        scope: str,
+        complaint_id: str,
+        title: str,
+        description: str,
+        created_at: float | None = None,
+    ):
+        signature = self.signature(title, description)
+        with self._lock:
+            self._signatures[complaint_id] = (scope, signature)
+            for key in self._band_keys(scope, signature):
+                self._buckets.setdefault(key, []).append(complaint_id)
+            self._expiry.append(
+                ((created_at or time.time()) + self.window, complaint_id)
+            )
+
+    def remove(self, complaint_id: str):
+        with self._lock:
+            self._remove(complaint_id)
+
+    def find(self, scope: str, title: str, description: str) -> str | None:
+        signature = self.signature(title, description)
+        with self._lock:
+            self._evict(time.time())
+            candidates = {
+                complaint_id
+                for key in self._band_keys(scope, signature)
+                for complaint_id in self._buckets.get(key, ())
+            }
+            best, best_similarity = None, self.threshold
+            for complaint_id in candidates:
+                similarity = float(
+                    np.mean(self._signatures[complaint_id][1] == signature)
+                )
+                if similarity >= best_similarity:
+                    best, best_similarity = complaint_id, similarity
+        return best
+
+    def sync(self, db: Session):
+        """
+        Adds open parent complaints created since the last sync, by any
+        worker. The first call loads the whole window.
+        """
+        now = datetime.now(timezone.utc)
+        since = (
+            self._synced_until - _SYNC_OVERLAP
+            if self._synced_until
+            else now - timedelta(seconds=self.window)
+        )
+        rows = (
+            db.query(models.Complaint, models.Student)
+            .join(models.Student, models.Student.id == models.Complaint.student_id)
+            .filter(models.Complaint.created_at >= since)
+            .filter(models.Complaint.parent_id.is_(None))
+            .filter(models.Complaint.status != "resolved")
+            .order_by(models.Complaint.created_at)
+            .all()
+        )
+        for complaint, student in rows:
+            with self._lock:
+                known = complaint.id in self._signatures
+            if not known:
+                self.add(
+                    duplicate_scope(complaint.category_id, student),
+                    complaint.id,
+                    complaint.title,
+                    complaint.description,
+                    complaint.created_at.timestamp(),
+                )
+        self._synced_until = now
+
+
+index = MinHashIndex(
+    threshold=settings.duplicate_similarity_threshold,
+    window_hours=settings.duplicate_window_hours,
+)
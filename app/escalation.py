@@ -0,0 +1,57 @@
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+from .snapshot import Snapshot
+
+
+class ReportingTree(Snapshot):
+    """
+    In-memory copy of the `Staff.reports_to` hierarchy, reloaded at most
+    every `refresh_seconds` or after `invalidate`. Walking up the tree costs
+    O(depth) dictionary lookups instead of a query per level.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        super().__init__(refresh_seconds)
+        self._manager: dict[int, int | None] = {}
+        self._role: dict[int, int] = {}
+        self._reports: dict[int, list[int]] = {}
+
+    def _load(self, db: Session):
+        manager, role, reports = {}, {}, defaultdict(list)
+        for staff_id, reports_to, role_id in db.query(
+            models.Staff.id, models.Staff.reports_to, models.Staff.role_id
+        ):
+            manager[staff_id] = reports_to
+            role[staff_id] = role_id
+            if reports_to is not None:
+                reports[reports_to].append(staff_id)
+        self._manager, self._role, self._reports = manager, role, dict(reports)
+
+    def escalation_candidates(self, staff_id: int, levels: int = 1) -> list[int]:
+        """
+        Staff `levels` above `staff_id`: the manager at that level and their
+        peers, the staff with the same role reporting to the same person.
+        Empty when the chain ends first.
+        """
+        target = staff_id
+        seen = {staff_id}
+        for _ in range(levels):
+            target = self._manager.get(target)
+            # * a reports_to cycle ends the chain like a missing manager does
+            if target is None or target in seen:
+                return []
+            seen.add(target)
+
+        parent = self._manager.get(target)
+        if parent is None:
+            return [target]
+        return [
+            peer
+            for peer in self._reports.get(parent, [target])
+            if self._role.get(peer) == self._role.get(target)
+        ]
+
+
+tree = ReportingTree(refresh_seconds=settings.escalation_tree_refresh_seconds)
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from enum import IntEnum
+from typing import Callable
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from . import models
+
+
+class EventType(IntEnum):
+    CREATED = 1
+    ASSIGNED = 2
+    RESPONDED = 3
+    STATUS_CHANGED = 4
+    FOLLOW_UP = 5
+    REASSIGNED = 6
+    ESCALATED = 7
+    RESOLVED = 8
+    RATED = 9
+
+
+class ActorType(IntEnum):
+    SYSTEM = 0
+    STUDENT = 1
+    STAFF = 2
+
+
+# * projections get every event in the transaction that appends it
+Projection = Callable[[Session, models.ComplaintEvent], None]
+projections: list[Projection] = []
+
+
+def projection(handler: Projection) -> Projection:
+    projections.append(handler)
+    return handler
+
+
+def record(
+    db: Session,
+    complaint_id: str,
+    event_type: EventType,
+    actor_type: ActorType,
+    actor_id: int | None = None,
+    staff_id: int | None = None,
+    value: int | None = None,
+    detail: str | None = None,
+) -> models.ComplaintEvent:
+    """Appends an event and applies it to the projections. The caller commits."""
+    event = models.ComplaintEvent(
+        complaint_id=complaint_id,
+        event_type=event_type,
+        actor_type=actor_type,
+        actor_id=actor_id,
+        staff_id=staff_id,
+        value=value,
+        detail=detail,
+    )
+    db.add(event)
+    for handler in projections:
+        handler(db, event)
+    return event
+
+
+def record_response(
+    db: Session,
+    complaint_id: str,
+    staff_id: int,
+    status: str,
+    response: str | None,
+):
+    record(
+        db,
+        complaint_id,
+        EventType.STATUS_CHANGED,
+        ActorType.STAFF,
+        staff_id,
+        detail=status,
+    )
+    if response:
+        record(
+            db,
+            complaint_id,
+            EventType.RESPONDED,
+            ActorType.STAFF,
+            staff_id,
+            detail=response,
+        )
+
+
+def seconds_since(moment: datetime | None) -> int | None:
+    if moment is None:
+        return None
+    return int((datetime.now(timezone.utc) - moment).total_seconds())
+
+
+@projection
+def resolution_stats(db: Session, event: models.ComplaintEvent):
+    """Keeps per-staff resolution counts and times for the assigned staff."""
+    if (
+        event.event_type != EventType.RESOLVED
+        or event.value is None
+        or event.staff_id is None
+    ):
+        return
+    stats = models.StaffResolutionStats
+    db.execute(
+        insert(stats)
+        .values(
+            staff_id=event.staff_id,
+            resolved_count=1,
+            total_resolution_seconds=event.value,
+        )
+        .on_conflict_do_update(
+            index_elements=[stats.staff_id],
+            set_={
+                "resolved_count": stats.resolved_count + 1,
+                "total_resolution_seconds": stats.total_resolution_seconds
+                + event.value,
+                "updated_at": func.now(),
+            },
+        )
+    )
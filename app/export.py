@@ -0,0 +1,155 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy.orm import Session
+from . import models
+
+CHUNK_SIZE = 1000
+
+COLUMNS = [
+    ("id", models.Complaint.id),
+    ("student_id", models.Complaint.student_id),
+    ("hall_name", models.Student.hallname),
+    ("department", models.Student.department),
+    ("category_id", models.Complaint.category_id),
+    ("priority_id", models.Complaint.priority_id),
+    ("title", models.Complaint.title),
+    ("description", models.Complaint.description),
+    ("status", models.Complaint.status),
+    ("parent_id", models.Complaint.parent_id),
+    ("closed_by", models.Complaint.closed_by),
+    ("created_at", models.Complaint.created_at),
+    ("staff_id", models.ComplaintAssignment.staff_id),
+    ("assignment_status", models.ComplaintAssignment.status),
+    ("response", models.ComplaintAssignment.response),
+    ("assigned_at", models.ComplaintAssignment.assigned_at),
+    ("resolved_at", models.ComplaintAssignment.resolved_at),
+    ("rating", models.Rating.rating),
+    ("feedback", models.Rating.feedback),
+]
+
+FIELD_NAMES = [name for name, _ in COLUMNS]
+TIMESTAMP_FIELDS = {"created_at", "assigned_at", "resolved_at"}
+INTEGER_FIELDS = {
+    "student_id",
+    "category_id",
+    "priority_id",
+    "closed_by",
+    "staff_id",
+    "rating",
+}
+
+
+def export_rows(
+    db: Session,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    hall_name: str | None = None,
+    department: str | None = None,
+    status: str | None = None,
+):
+    """Plain row query streamed from a server-side cursor `CHUNK_SIZE` at a time."""
+    query = (
+        db.query(*[column for _, column in COLUMNS])
+        .join(models.Student, models.Student.id == models.Complaint.student_id)
+        .outerjoin(
+            models.ComplaintAssignment,
+            models.ComplaintAssignment.complaint_id == models.Complaint.id,
+        )
+        .outerjoin(models.Rating, models.Rating.complaint_id == models.Complaint.id)
+    )
+    if start:
+        query = query.filter(models.Complaint.created_at >= start)
+    if end:
+        query = query.filter(models.Complaint.created_at < end)
+    if hall_name:
+        query = query.filter(models.Student.hallname == hall_name)
+    if department:
+        query = query.filter(models.Student.department == department)
+    if status:
+        query = query.filter(models.Complaint.status == status)
+    return query.order_by(models.Complaint.created_at).yield_per(CHUNK_SIZE)
+
+
+def _chunks(rows) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_csv(rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELD_NAMES)
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def to_jsonl(rows) -> Iterator[str]:
+    for chunk in _chunks(rows):
+        yield "".join(
+            json.dumps(dict(zip(FIELD_NAMES, row)), default=str) + "\n" for row in chunk
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def to_parquet(rows) -> Iterator[bytes]:
+    """Writes one row group per chunk. pyarrow is imported on first use only."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            (
+                name,
+                (
+                    pa.timestamp("us", tz="UTC")
+                    if name in TIMESTAMP_FIELDS
+                    else pa.int64() if name in INTEGER_FIELDS else pa.string()
+                ),
+            )
+            for name in FIELD_NAMES
+        ]
+    )
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _chunks(rows):
+            columns = list(zip(*chunk))
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,99 @@
+import hashlib
+import re
+import threading
+import time
+import requests
+from cachetools import TTLCache
+from .config import settings
+
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+
+_MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+
+def _max_age(cache_control: str | None) -> int:
+    if not cache_control or "no-store" in cache_control:
+        return 0
+    match = _MAX_AGE_PATTERN.search(cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class CachingRequest:
+    """
+    google-auth transport that keeps one pooled HTTP session and caches GET
+    responses (Google's signing certs) for as long as their `Cache-Control`
+    max-age allows, so verification doesn't go back to Google on every login.
+    The google-auth transport is only imported on first use.
+    """
+
+    def __init__(self, session: requests.Session | None = None):
+        self._session = session
+        self._transport = None
+        self._cache: dict[str, tuple[float, object]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            from google.auth.transport import requests as google_requests
+
+            self._transport = google_requests.Request(
+                session=self._session or requests.Session()
+            )
+        return self._transport
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET":
+            return self.transport(
+                url, method=method, body=body, headers=headers, timeout=timeout, **kwargs
+            )
+
+        cached = self._cache.get(url)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        # * only one thread refreshes an expired entry, the rest reuse it
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+            response = self.transport(
+                url, method=method, body=body, headers=headers, timeout=timeout, **kwargs
+            )
+            max_age = _max_age(response.headers.get("cache-control"))
+            if response.status == 200 and max_age:
+                self._cache[url] = (time.monotonic() + max_age, response)
+            return response
+
+
+google_request = CachingRequest()
+
+# * token hash -> verified claims, entries are also checked against `exp`
+_verified_tokens = TTLCache(maxsize=1024, ttl=300)
+# * cachetools caches aren't thread-safe and logins run in the threadpool
+_verified_tokens_lock = threading.Lock()
+
+
+def verify_google_token(token: str) -> dict:
+    """
+    Verifies a Google ID token against the cached certs and returns its claims.
+    Raises ValueError if the token is invalid or issued by someone else.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    with _verified_tokens_lock:
+        idinfo = _verified_tokens.get(key)
+    if idinfo and idinfo["exp"] > time.time():
+        return idinfo
+
+    from google.oauth2 import id_token
+
+    idinfo = id_token.verify_oauth2_token(
+        token, google_request, settings.google_client_id
+    )
+    if idinfo["iss"] not in GOOGLE_ISSUERS:
+        raise ValueError("Wrong issuer.")
+
+    with _verified_tokens_lock:
+        _verified_tokens[key] = idinfo
+    return idinfo
@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from .config import settings
+
+# * passlib's default, so utils.verify_password accepts these hashes
+BCRYPT_ROUNDS = 12
+# * below this a pool round trip costs more than it saves
+PARALLEL_THRESHOLD = 4
+
+_pool: ProcessPoolExecutor | None = None
+_pool_pid: int | None = None
+_lock = threading.Lock()
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # * spawned rather than forked, the web worker has threads running
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def hash_passwords(passwords: list[str | None]) -> list[str | None]:
+    """
+    Hashes a batch of passwords across all cores, keeping the order. Empty
+    entries come back as None.
+    """
+    pending = [password for password in passwords if password]
+    if len(pending) < PARALLEL_THRESHOLD:
+        hashed = iter([_hash(password) for password in pending])
+    else:
+        workers = settings.password_hash_workers or os.cpu_count() or 1
+        hashed = _executor().map(
+            _hash, pending, chunksize=max(1, len(pending) // (workers * 4))
+        )
+    return [next(hashed) if password else None for password in passwords]
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -0,0 +1,162 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, func, null, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+
+
+class IdempotentRequest:
+    def __init__(self, response: Any = None):
+        self.response = response
+        self.replayed = response is not None
+
+
+class IdempotencyStore:
+    """
+    Maps `Idempotency-Key` -> (request hash, stored response) for `ttl_seconds`
+    in the `idempotency_keys` table, so a retry is recognised whichever
+    worker it reaches and across restarts. A retry with the same key and
+    payload gets the stored response back, a retry with a different payload
+    is rejected, and a retry that arrives while the first attempt is still
+    running gets a 409. An attempt that holds its key past `lock_seconds`
+    without finishing, because its worker died, is taken over by the retry.
+
+    Every step runs on the request's own session, so a keyed request holds one
+    pool connection like any other; the claim is committed before the handler
+    body runs so other workers see it straight away.
+    """
+
+    PRUNE_SECONDS = 60 * 60
+
+    def __init__(self, ttl_seconds: int, lock_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self._pruned_at = 0.0
+
+    def begin(self, db: Session, key: str, request_hash: str) -> Any:
+        now = datetime.now(timezone.utc)
+        statement = insert(models.IdempotencyKey).values(
+            key=key,
+            request_hash=request_hash,
+            locked_until=now + timedelta(seconds=self.lock_seconds),
+            expires_at=now + timedelta(seconds=self.ttl_seconds),
+        )
+        existing = models.IdempotencyKey
+        # * claims a new key, an expired one or an abandoned attempt
+        claimed = db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["key"],
+                set_={
+                    "request_hash": statement.excluded.request_hash,
+                    "response": null(),
+                    "locked_until": statement.excluded.locked_until,
+                    "expires_at": statement.excluded.expires_at,
+                },
+                where=or_(
+                    existing.expires_at < func.now(),
+                    and_(
+                        existing.response.is_(None),
+                        existing.locked_until < func.now(),
+                        existing.request_hash == statement.excluded.request_hash,
+                    ),
+                ),
+            ).returning(existing.key)
+        ).scalar()
+        entry = (
+            None
+            if claimed
+            else db.query(existing.request_hash, existing.response)
+            .filter(existing.key == key)
+            .first()
+        )
+        db.commit()
+        self._prune(db)
+
+        if claimed or entry is None:
+            return None
+
+        stored_hash, response = entry
+        if stored_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request",
+            )
+        if response is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+            )
+        return response
+
+    def complete(self, db: Session, key: str, response: Any):
+        response = jsonable_encoder(response)
+        db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).update(
+            {"response": response, "locked_until": None},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def release(self, db: Session, key: str):
+        # * drops whatever the failed attempt left in the transaction
+        db.rollback()
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.response.is_(None),
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def _prune(self, db):
+        if time.monotonic() - self._pruned_at < self.PRUNE_SECONDS:
+            return
+        self._pruned_at = time.monotonic()
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.expires_at < func.now()
+        ).delete(synchronize_session=False)
+        db.commit()
+
+
+store = IdempotencyStore(
+    ttl_seconds=settings.idempotency_ttl_seconds,
+    lock_seconds=settings.idempotency_lock_seconds,
+)
+
+
+def request_hash(*parts) -> str:
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+@contextmanager
+def idempotent(db: Session, key: str | None, scope: str, *parts):
+    """
+    Wraps a handler body. When `request.replayed` is set the handler should
+    return `request.response` as is; otherwise it sets `request.response` and
+    it is stored for later retries. Failed attempts release the key.
+    """
+    if not key:
+        yield IdempotentRequest()
+        return
+
+    scoped_key = f"{scope}:{key}"
+    digest = request_hash(*parts)
+    request = IdempotentRequest(store.begin(db, scoped_key, digest))
+    if request.replayed:
+        yield request
+        return
+
+    try:
+        yield request
+    except BaseException:
+        store.release(db, scoped_key)
+        raise
+
+    if request.response is None:
+        store.release(db, scoped_key)
+    else:
+        store.complete(db, scoped_key, request.response)
@@ -1,11 +1,24 @@
-import cloudinary
+import logging
+import time
+from contextlib import asynccontextmanager
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from .database import engine
-from . import models
-from .routers import auth, staff, student, complaints
+from . import hashing
 from .config import settings
+from .database import LAST_WRITE_COOKIE, engine, replica_router
+from .middleware import LastWriteMiddleware, SecurityHeadersMiddleware
+from .routers import (
+    auth,
+    staff,
+    student,
+    complaints,
+    files,
+    notifications,
+    uploads,
+)
 
 # TODO: WORK ON SENDING THE EMAILS TO THE STAFF AND STUDENTS WHEN:
 # 1: STUDENTS SUBMITS A COMPLAINT (COMPLAINT ID IS SENT)
@@ -13,19 +26,24 @@ from .config import settings
 # 3: STAFF IS ASSIGNED A TASK
 # 4: STAFF REGISTERS ONTO THE SYSTEM
 
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
 
-origins = ["*"]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # * the schema is managed by `alembic upgrade head`, nothing touches the
+    # * database or the Gemini, Cloudinary and Google SDKs until first use
+    logger.info(f"Started in {(time.perf_counter() - _import_started) * 1000:.0f}ms")
+    yield
+    hashing.shutdown()
+    for replica in replica_router.replicas:
+        replica.dispose()
+    engine.dispose()
 
-cloudinary.config(
-    cloud_name=settings.cloudinary_cloud_name,
-    api_key=settings.cloudinary_api_key,
-    api_secret=settings.cloudinary_secret_key,
-    secure=True,
-)
 
+app = FastAPI(lifespan=lifespan)
+
+origins = ["*"]
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,15 +57,19 @@ app.add_middleware(
 )
 
 
-class COOPMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        response = await call_next(request)
-        response.headers["Cross-Origin-Opener-Policy"] = "same-origin-allow-popups"
-        response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
-        return response
-
+app.add_middleware(
+    SecurityHeadersMiddleware,
+    headers={
+        "Cross-Origin-Opener-Policy": "same-origin-allow-popups",
+        "Cross-Origin-Embedder-Policy": "require-corp",
+    },
+)
 
-app.add_middleware(COOPMiddleware)
+app.add_middleware(
+    LastWriteMiddleware,
+    cookie=LAST_WRITE_COOKIE,
+    max_age=settings.read_your_writes_seconds,
+)
 
 
 @app.get("/")
@@ -59,3 +81,6 @@ app.include_router(auth.router)
 app.include_router(staff.router)
 app.include_router(student.router)
 app.include_router(complaints.router)
+app.include_router(notifications.router)
+app.include_router(files.router)
+app.include_router(uploads.router)
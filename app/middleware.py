@@ -0,0 +1,69 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class SecurityHeadersMiddleware:
+    """
+    Pure ASGI middleware that injects the cross-origin isolation headers and
+    reports how long the request took to produce its response headers.
+
+    Unlike BaseHTTPMiddleware it never spawns a task or buffers the body, so
+    streaming responses pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, headers: dict[str, str] | None = None):
+        self.app = app
+        self.headers = [
+            (key.lower().encode("latin-1"), value.encode("latin-1"))
+            for key, value in (headers or {}).items()
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for key, value in self.headers:
+                    headers.raw.append((key, value))
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers.append("Server-Timing", f"app;dur={elapsed_ms:.2f}")
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class LastWriteMiddleware:
+    """
+    Sets `cookie` to the time of the request's last commit, recorded in the
+    request state, so later reads from the same client can skip lagging
+    replicas on any worker.
+    """
+
+    def __init__(self, app: ASGIApp, cookie: str, max_age: float):
+        self.app = app
+        self.cookie = cookie
+        self.max_age = int(max_age) + 1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                last_write = scope.get("state", {}).get("last_write")
+                if last_write is not None:
+                    MutableHeaders(scope=message).append(
+                        "Set-Cookie",
+                        f"{self.cookie}={last_write:.3f}; Max-Age={self.max_age}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,5 +1,15 @@
 import uuid
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Integer,
+    SmallInteger,
+    String,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
@@ -9,6 +19,9 @@ from .database import Base
 class Complaint(Base):
     __tablename__ = "complaints"
 
+    # * partitioned, so assignments, ratings, notifications, events and
+    # * parent_id link to it without foreign keys, see migration 0003
+
     id = Column(
         String,
         primary_key=True,
@@ -26,12 +39,17 @@ class Complaint(Base):
     status = Column(String)  # pending, in-progress, resolved, rejected
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     closed_by = Column(Integer, ForeignKey("staffs.id"))
+    # * set when the complaint is a near-duplicate of another open complaint
+    parent_id = Column(String)
     is_rated = Column(Boolean, server_default=text("false"))
 
     category = relationship("ComplaintCategory")
     priority = relationship("Priorities")
     assignment = relationship(
-        "ComplaintAssignment", uselist=False, back_populates="complaints"
+        "ComplaintAssignment",
+        primaryjoin="Complaint.id == foreign(ComplaintAssignment.complaint_id)",
+        uselist=False,
+        back_populates="complaints",
     )
 
 
@@ -46,11 +64,7 @@ class ComplaintAssignment(Base):
     __tablename__ = "complaint_assignment"
 
     id = Column(Integer, primary_key=True, nullable=False)
-    complaint_id = Column(
-        String,
-        ForeignKey("complaints.id", ondelete="CASCADE"),
-        nullable=False,
-    )
+    complaint_id = Column(String, nullable=False)
     staff_id = Column(Integer, ForeignKey("staffs.id"), nullable=False)
     status = Column(String)  # unassigned, assigned, resolved, escalated
     response = Column(String)
@@ -58,8 +72,13 @@ class ComplaintAssignment(Base):
     assigned_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     resolved_at = Column(TIMESTAMP(timezone=True))
+    leased_until = Column(TIMESTAMP(timezone=True))  # claimed from the work queue
 
-    complaints = relationship("Complaint", back_populates="assignment")
+    complaints = relationship(
+        "Complaint",
+        primaryjoin="Complaint.id == foreign(ComplaintAssignment.complaint_id)",
+        back_populates="assignment",
+    )
     staff = relationship("Staff")
 
 
@@ -102,6 +121,19 @@ class Staff(Base):
     )
 
     role = relationship("Role")
+    workload = relationship(
+        "StaffWorkload", uselist=False, cascade="all, delete-orphan"
+    )
+
+
+class StaffWorkload(Base):
+    __tablename__ = "staff_workload"
+
+    # * open assignments per staff member, locked while assigning
+    staff_id = Column(
+        Integer, ForeignKey("staffs.id", ondelete="CASCADE"), primary_key=True
+    )
+    open_complaints = Column(Integer, nullable=False, server_default=text("0"))
 
 
 class Role(Base):
@@ -111,28 +143,59 @@ class Role(Base):
     name = Column(String, nullable=False)
 
 
+class RoutingRule(Base):
+    __tablename__ = "routing_rules"
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    # * NULL is the default chain for categories without rules of their own
+    category_id = Column(Integer, ForeignKey("complaint_categories.id"))
+    role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
+    scope = Column(
+        String, nullable=False, server_default="any"
+    )  # any, hall, department
+    position = Column(SmallInteger, nullable=False)  # order within the fallback chain
+
+
 class Priorities(Base):
     __tablename__ = "priorities"
 
     id = Column(Integer, primary_key=True, nullable=False)
     level = Column(String, nullable=False)
     description = Column(String)
+    rank = Column(SmallInteger, nullable=False, server_default=text("2"))  # 0 first
+    sla_hours = Column(Integer)  # time allowed to resolve, None for no deadline
 
 
 class Rating(Base):
     __tablename__ = "ratings"
 
     id = Column(Integer, primary_key=True, nullable=False)
-    complaint_id = Column(
-        String, ForeignKey("complaints.id", ondelete="CASCADE"), nullable=False
-    )
+    complaint_id = Column(String, nullable=False)
     rating = Column(Integer)
     feedback = Column(String)
     created_at = Column(
         TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
     )
 
-    complaints = relationship("Complaint")
+    complaints = relationship(
+        "Complaint", primaryjoin="Complaint.id == foreign(Rating.complaint_id)"
+    )
+
+
+class StaffScore(Base):
+    __tablename__ = "staff_scores"
+
+    # * running rating aggregates, updated with every new rating
+    staff_id = Column(
+        Integer, ForeignKey("staffs.id", ondelete="CASCADE"), primary_key=True
+    )
+    rating_count = Column(Integer, nullable=False, server_default=text("0"))
+    rating_sum = Column(Integer, nullable=False, server_default=text("0"))
+    mean = Column(Float, nullable=False, server_default=text("0"))
+    score = Column(Float, nullable=False)  # Bayesian-smoothed mean
+    updated_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
 
 
 class Notification(Base):
@@ -140,14 +203,83 @@ class Notification(Base):
 
     id = Column(Integer, primary_key=True, nullable=False)
     user_id = Column(Integer, nullable=False)
-    complaint_id = Column(
-        String, ForeignKey("complaints.id", ondelete="CASCADE"), nullable=False
-    )
+    user_type = Column(String, nullable=False, server_default="staff")  # student, staff
+    complaint_id = Column(String, nullable=False)
     message = Column(String, nullable=False)
     is_read = Column(Boolean, server_default=text("false"))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
 
 
+class ComplaintEvent(Base):
+    __tablename__ = "complaint_events"
+
+    # * append-only, see app/events.py for the type codes
+    id = Column(BigInteger, primary_key=True, nullable=False)
+    complaint_id = Column(String, nullable=False)
+    event_type = Column(SmallInteger, nullable=False)
+    actor_type = Column(SmallInteger, nullable=False)
+    actor_id = Column(Integer)
+    staff_id = Column(Integer)  # assignee the event moved the complaint to
+    value = Column(Integer)  # rating or resolution time in seconds
+    detail = Column(String)
+    created_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
+class StaffResolutionStats(Base):
+    __tablename__ = "staff_resolution_stats"
+
+    # * projection of the RESOLVED events
+    staff_id = Column(Integer, primary_key=True, nullable=False)
+    resolved_count = Column(Integer, nullable=False, server_default=text("0"))
+    total_resolution_seconds = Column(
+        BigInteger, nullable=False, server_default=text("0")
+    )
+    updated_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
+    )
+
+
+class NotificationCounter(Base):
+    __tablename__ = "notification_counters"
+
+    # * unread notifications per user, kept in step with inserts and reads
+    user_type = Column(String, primary_key=True, nullable=False)
+    user_id = Column(Integer, primary_key=True, nullable=False)
+    unread = Column(Integer, nullable=False, server_default=text("0"))
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # * kept until the token would have expired anyway
+    jti = Column(String, primary_key=True, nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class TokenCutoff(Base):
+    __tablename__ = "token_cutoffs"
+
+    # * tokens of the user issued before not_before are rejected
+    user_type = Column(String, primary_key=True, nullable=False)
+    user_id = Column(Integer, primary_key=True, nullable=False)
+    not_before = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True, nullable=False)  # scope:Idempotency-Key
+    request_hash = Column(String, nullable=False)
+    response = Column(
+        JSONB(none_as_null=True)
+    )  # NULL while the first attempt is running
+    # * an attempt whose worker died stops blocking retries after this
+    locked_until = Column(TIMESTAMP(timezone=True))
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
 class Course(Base):
     __tablename__ = "courses"
 
@@ -0,0 +1,83 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from . import models
+
+
+def create_notification(
+    db: Session, user_type: str, user_id: int, complaint_id: str, message: str
+):
+    """
+    Adds a notification and bumps the user's unread counter in the same
+    transaction. The caller commits.
+    """
+    db.add(
+        models.Notification(
+            user_type=user_type,
+            user_id=user_id,
+            complaint_id=complaint_id,
+            message=message,
+        )
+    )
+    db.execute(
+        insert(models.NotificationCounter)
+        .values(user_type=user_type, user_id=user_id, unread=1)
+        .on_conflict_do_update(
+            index_elements=["user_type", "user_id"],
+            set_={"unread": models.NotificationCounter.unread + 1},
+        )
+    )
+
+
+def unread_count(db: Session, user_type: str, user_id: int) -> int:
+    counter = db.get(models.NotificationCounter, (user_type, user_id))
+    return counter.unread if counter else 0
+
+
+def mark_read(db: Session, user_type: str, user_id: int, ids: list[int] | None):
+    """Marks notifications read and takes them off the counter. The caller commits."""
+    query = (
+        db.query(models.Notification)
+        .filter(models.Notification.user_type == user_type)
+        .filter(models.Notification.user_id == user_id)
+        .filter(models.Notification.is_read.is_(False))
+    )
+    if ids:
+        query = query.filter(models.Notification.id.in_(ids))
+    marked = query.update({"is_read": True}, synchronize_session=False)
+
+    if marked:
+        db.query(models.NotificationCounter).filter(
+            models.NotificationCounter.user_type == user_type,
+            models.NotificationCounter.user_id == user_id,
+        ).update(
+            {"unread": models.NotificationCounter.unread - marked},
+            synchronize_session=False,
+        )
+    return marked
+
+
+def delete_for_complaints(db: Session, complaint_ids: list[str]):
+    """
+    Deletes the notifications of these complaints and takes the unread ones
+    off their users' counters. The caller commits.
+    """
+    notifications = models.Notification
+    unread = (
+        db.query(notifications.user_type, notifications.user_id, func.count())
+        .filter(notifications.complaint_id.in_(complaint_ids))
+        .filter(notifications.is_read.is_(False))
+        .group_by(notifications.user_type, notifications.user_id)
+        .all()
+    )
+    for user_type, user_id, count in unread:
+        db.query(models.NotificationCounter).filter(
+            models.NotificationCounter.user_type == user_type,
+            models.NotificationCounter.user_id == user_id,
+        ).update(
+            {"unread": func.greatest(models.NotificationCounter.unread - count, 0)},
+            synchronize_session=False,
+        )
+    db.query(notifications).filter(
+        notifications.complaint_id.in_(complaint_ids)
+    ).delete(synchronize_session=False)
@@ -30,4 +30,42 @@ async def send_email(recipient_email: str, subject: str, content: str):
     if response.status_code == 201:
         return {"success": True, "message": "Email sent successfully!"}
     else:
-        return {"success": False, "error": response.json()}
\ No newline at end of file
+        return {"success": False, "error": response.json()}
+
+
+BULK_TRIGGER_LIMIT = 100  # events per bulk trigger request
+
+
+async def send_bulk_email(messages: list[tuple[str, str, str]]):
+    """
+    Sends (recipient_email, subject, content) messages through Novu's bulk
+    trigger, up to BULK_TRIGGER_LIMIT per request over one connection.
+    """
+    headers = {
+        "Authorization": f"ApiKey {NOVU_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    failed = []
+    async with httpx.AsyncClient() as client:
+        for start in range(0, len(messages), BULK_TRIGGER_LIMIT):
+            batch = messages[start : start + BULK_TRIGGER_LIMIT]
+            events = [
+                {
+                    "name": "welcome-email",
+                    "to": [{"subscriberId": email, "email": email}],
+                    "payload": {"subject": subject, "message": content},
+                }
+                for email, subject, content in batch
+            ]
+            response = await client.post(
+                f"{NOVU_API_URL}/events/trigger/bulk",
+                json={"events": events},
+                headers=headers,
+            )
+            if response.status_code != 201:
+                failed += [email for email, _, _ in batch]
+
+    if failed:
+        return {"success": False, "failed": failed}
+    return {"success": True, "message": f"{len(messages)} emails sent"}
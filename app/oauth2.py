@@ -1,16 +1,205 @@
+import logging
+import threading
+import time
+import uuid
 from datetime import timedelta, datetime, timezone
+from functools import lru_cache
 from typing import Optional, Annotated
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key,
+    load_pem_public_key,
+)
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
 import jwt
 from jwt.exceptions import InvalidTokenError
 from fastapi import Depends, HTTPException, status
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from .database import get_db
+from .database import SessionLocal, get_db
 from . import models, schemas
 from .config import settings
 
 student_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="student-login")
 staff_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="staff-login")
+user_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="student-login")
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+STUDENT = "student"
+STAFF = "staff"
+DEFAULT_KID = "default"
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRevocationList:
+    """
+    Revocations shared by every worker through the database. Refresh tokens
+    are revoked by `jti` in `revoked_tokens` and looked up there when used.
+    A forced logout writes a per-user cut-off to `token_cutoffs`, and every
+    token issued before it is rejected. Workers pull new cut-offs at most
+    every `sync_seconds`, so access tokens are checked against an in-memory
+    copy instead of a query per request.
+    """
+
+    # * re-read this far back so a cut-off committed late isn't skipped
+    SYNC_OVERLAP = timedelta(minutes=1)
+    PRUNE_SECONDS = 60 * 60
+
+    def __init__(self, sync_seconds: float, lifetime_seconds: int):
+        self.sync_seconds = sync_seconds
+        self.lifetime_seconds = lifetime_seconds
+        self._not_before: dict[tuple[str, int], float] = {}
+        self._seen_until: datetime | None = None
+        self._synced_at: float | None = None
+        self._pruned_at = 0.0
+        self._lock = threading.Lock()
+
+    def revoke(self, payload: dict) -> bool:
+        """Revokes the token, returns False if it was already revoked."""
+        with SessionLocal() as db:
+            revoked = db.execute(
+                insert(models.RevokedToken)
+                .values(
+                    jti=payload["jti"],
+                    expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc),
+                )
+                .on_conflict_do_nothing(index_elements=["jti"])
+                .returning(models.RevokedToken.jti)
+            ).scalar()
+            db.commit()
+        return revoked is not None
+
+    def revoke_user(self, user_type: str, user_id: int):
+        not_before = datetime.now(timezone.utc)
+        statement = insert(models.TokenCutoff).values(
+            user_type=user_type, user_id=user_id, not_before=not_before
+        )
+        with SessionLocal() as db:
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["user_type", "user_id"],
+                    set_={"not_before": statement.excluded.not_before},
+                )
+            )
+            db.commit()
+        with self._lock:
+            self._not_before[(user_type, user_id)] = not_before.timestamp()
+
+    def _is_jti_revoked(self, jti: str | None) -> bool:
+        with SessionLocal() as db:
+            return (
+                db.query(models.RevokedToken.jti)
+                .filter(models.RevokedToken.jti == jti)
+                .first()
+                is not None
+            )
+
+    def _sync(self):
+        if (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at < self.sync_seconds
+        ):
+            return
+        with self._lock:
+            if (
+                self._synced_at is not None
+                and time.monotonic() - self._synced_at < self.sync_seconds
+            ):
+                return
+            # * older cut-offs can't match a token that hasn't expired
+            since = (
+                self._seen_until - self.SYNC_OVERLAP
+                if self._seen_until
+                else datetime.now(timezone.utc)
+                - timedelta(seconds=self.lifetime_seconds)
+            )
+            try:
+                with SessionLocal() as db:
+                    cut_offs = (
+                        db.query(
+                            models.TokenCutoff.user_type,
+                            models.TokenCutoff.user_id,
+                            models.TokenCutoff.not_before,
+                        )
+                        .filter(models.TokenCutoff.not_before > since)
+                        .all()
+                    )
+                    if time.monotonic() - self._pruned_at > self.PRUNE_SECONDS:
+                        self._prune(db)
+            except SQLAlchemyError as e:
+                logger.warning(f"Couldn't sync token revocations: {str(e)}")
+                cut_offs = []
+            for user_type, user_id, not_before in cut_offs:
+                self._not_before[(user_type, user_id)] = not_before.timestamp()
+                self._seen_until = max(self._seen_until or not_before, not_before)
+            self._synced_at = time.monotonic()
+
+    def _prune(self, db: Session):
+        now = datetime.now(timezone.utc)
+        db.query(models.RevokedToken).filter(
+            models.RevokedToken.expires_at < now
+        ).delete(synchronize_session=False)
+        db.query(models.TokenCutoff).filter(
+            models.TokenCutoff.not_before
+            < now - timedelta(seconds=self.lifetime_seconds)
+        ).delete(synchronize_session=False)
+        db.commit()
+        self._pruned_at = time.monotonic()
+
+    def is_revoked(self, payload: dict) -> bool:
+        if payload.get("type") == REFRESH_TOKEN and self._is_jti_revoked(
+            payload.get("jti")
+        ):
+            return True
+        self._sync()
+        cut_off = self._not_before.get((payload.get("user_type"), payload.get("id")))
+        # * iat carries sub-second precision, so a login right after a
+        # * logout-everywhere in the same second stays valid
+        return cut_off is not None and payload.get("iat", 0) < cut_off
+
+
+revocation_list = TokenRevocationList(
+    sync_seconds=settings.token_revocation_sync_seconds,
+    lifetime_seconds=settings.refresh_token_expiration_days * 24 * 60 * 60,
+)
+
+
+@lru_cache(maxsize=None)
+def _load_private_key(pem: str):
+    return load_pem_private_key(pem.encode(), password=None)
+
+
+@lru_cache(maxsize=None)
+def _load_public_key(pem: str):
+    return load_pem_public_key(pem.encode())
+
+
+def _signing_key() -> tuple[str, object, str]:
+    """Returns the (kid, key, algorithm) new tokens are signed with."""
+    if settings.jwt_private_keys:
+        kid = settings.jwt_active_kid or next(iter(settings.jwt_private_keys))
+        key = _load_private_key(settings.jwt_private_keys[kid])
+        return kid, key, settings.jwt_asymmetric_algorithm
+    return DEFAULT_KID, settings.secret_key, settings.algorithm
+
+
+def _verification_key(kid: str | None) -> tuple[object, str]:
+    # * the header is unverified at this point, kid can be any JSON value
+    if kid is not None and not isinstance(kid, str):
+        raise InvalidTokenError("Invalid key id")
+    if kid in settings.jwt_public_keys:
+        key = _load_public_key(settings.jwt_public_keys[kid])
+        return key, settings.jwt_asymmetric_algorithm
+    if kid in settings.jwt_private_keys:
+        # * the public half of a signing key that wasn't listed separately
+        key = _load_private_key(settings.jwt_private_keys[kid]).public_key()
+        return key, settings.jwt_asymmetric_algorithm
+    if kid in (None, DEFAULT_KID):
+        return settings.secret_key, settings.algorithm
+    raise InvalidTokenError(f"Unknown key id {kid}")
 
 
 def get_student(email: str, db: Session = Depends(get_db)) -> Optional[schemas.Student]:
@@ -37,63 +226,141 @@ def get_staff(email: str, db: Session = Depends(get_db)) -> Optional[schemas.Sta
         )
 
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def student_claims(student: models.Student) -> dict:
+    return {
+        "sub": student.email,
+        "user_type": STUDENT,
+        "id": student.id,
+        "department": student.department,
+        "hall_name": student.hallname,
+    }
+
+
+def staff_claims(staff: models.Staff) -> dict:
+    return {
+        "sub": staff.email,
+        "user_type": STAFF,
+        "id": staff.id,
+        "role_id": staff.role_id,
+        "role": staff.role.name if staff.role else None,
+        "department": staff.department,
+        "hall_name": staff.hall_name,
+    }
+
+
+def _encode(data: dict, token_type: str, expires_delta: timedelta) -> str:
+    now = datetime.now(timezone.utc)
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.secret_key, algorithm=settings.algorithm
+    to_encode.update(
+        {
+            "type": token_type,
+            "jti": uuid.uuid4().hex,
+            "iat": now.timestamp(),
+            "exp": now + expires_delta,
+        }
     )
-    return encoded_jwt
+    kid, key, algorithm = _signing_key()
+    return jwt.encode(to_encode, key, algorithm=algorithm, headers={"kid": kid})
+
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.access_token_expiration_minutes)
+    return _encode(data, ACCESS_TOKEN, expires_delta)
+
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    if not expires_delta:
+        expires_delta = timedelta(days=settings.refresh_token_expiration_days)
+    # * refresh tokens only carry identity, claims are re-read on refresh
+    identity = {key: data[key] for key in ("sub", "user_type", "id")}
+    return _encode(identity, REFRESH_TOKEN, expires_delta)
+
 
+def create_token_pair(data: dict) -> dict:
+    return {
+        "access_token": create_access_token(data),
+        "refresh_token": create_refresh_token(data),
+        "token_type": "bearer",
+    }
 
-async def get_current_student(
-    token: Annotated[str, Depends(student_oauth2_scheme)], db: Session = Depends(get_db)
-) -> schemas.Student:
-    credential_exception = HTTPException(
+
+def decode_token(token: str, token_type: str, user_type: str | None = None) -> dict:
+    """Verifies the signature, type and revocation status of a token locally."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    key, algorithm = _verification_key(kid)
+    payload = jwt.decode(token, key, algorithms=[algorithm])
+    if payload.get("type") != token_type:
+        raise InvalidTokenError("Wrong token type")
+    if user_type and payload.get("user_type") != user_type:
+        raise InvalidTokenError("Wrong user type")
+    if revocation_list.is_revoked(payload):
+        raise InvalidTokenError("Token has been revoked")
+    return payload
+
+
+def _credential_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def get_current_student(
+    token: Annotated[str, Depends(student_oauth2_scheme)],
+) -> schemas.StudentPrincipal:
     try:
-        payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
+        payload = decode_token(token, ACCESS_TOKEN, STUDENT)
+        return schemas.StudentPrincipal(
+            id=payload["id"],
+            email=payload["sub"],
+            department=payload.get("department"),
+            hallname=payload.get("hall_name"),
         )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credential_exception
-        token_data: schemas.TokenData = schemas.TokenData(email=email)
-    except InvalidTokenError:
-        raise credential_exception
-    user: Optional[schemas.Student] = get_student(email=token_data.email, db=db)
-    if user is None:
-        raise credential_exception
-    return user
-
-
-async def get_current_staff(
-    token: Annotated[str, Depends(staff_oauth2_scheme)], db: Session = Depends(get_db)
-) -> schemas.Staff:
-    credential_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    except (InvalidTokenError, KeyError, ValidationError):
+        raise _credential_exception()
+
+
+def get_current_staff(
+    token: Annotated[str, Depends(staff_oauth2_scheme)],
+) -> schemas.StaffPrincipal:
     try:
-        payload = jwt.decode(
-            token, settings.secret_key, algorithms=[settings.algorithm]
+        payload = decode_token(token, ACCESS_TOKEN, STAFF)
+        return schemas.StaffPrincipal(
+            id=payload["id"],
+            email=payload["sub"],
+            role_id=payload["role_id"],
+            role=payload.get("role"),
+            department=payload["department"],
+            hall_name=payload.get("hall_name"),
         )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credential_exception
-        token_data: schemas.TokenData = schemas.TokenData(email=email)
-
-    except InvalidTokenError:
-        raise credential_exception
-    user: Optional[schemas.Staff] = get_staff(email=token_data.email, db=db)
-    if user is None:
-        raise credential_exception
-    return user
+    except (InvalidTokenError, KeyError, ValidationError):
+        raise _credential_exception()
+
+
+def is_admin(staff: schemas.StaffPrincipal) -> bool:
+    return staff.role in settings.admin_roles
+
+
+def get_current_admin(
+    staff: Annotated[schemas.StaffPrincipal, Depends(get_current_staff)],
+) -> schemas.StaffPrincipal:
+    """Staff whose role is one of `settings.admin_roles`."""
+    if not is_admin(staff):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This action requires an admin role",
+        )
+    return staff
+
+
+def get_current_user(
+    token: Annotated[str, Depends(user_oauth2_scheme)],
+) -> schemas.UserPrincipal:
+    """Accepts either a student or a staff access token."""
+    try:
+        payload = decode_token(token, ACCESS_TOKEN)
+        return schemas.UserPrincipal(id=payload["id"], user_type=payload["user_type"])
+    except (InvalidTokenError, KeyError, ValidationError):
+        raise _credential_exception()
@@ -0,0 +1,254 @@
+import codecs
+import csv
+import itertools
+from typing import BinaryIO, Iterable, Iterator
+from pydantic import ValidationError
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import escalation, hashing, models, schemas
+
+INSERT_BATCH_SIZE = 1000
+
+
+def read_csv(file: BinaryIO) -> Iterator[dict]:
+    """Rows of an uploaded CSV, decoded as they're read. Empty cells are None."""
+    for row in csv.DictReader(codecs.iterdecode(file, "utf-8-sig")):
+        yield {
+            key: (value.strip() or None) if isinstance(value, str) else value
+            for key, value in row.items()
+            if key
+        }
+
+
+def parse_rows(
+    rows, schema, start: int = 1
+) -> tuple[list, list[schemas.ImportConflict]]:
+    """Validates raw rows against `schema`, collecting the rows that fail."""
+    parsed, conflicts = [], []
+    for number, row in enumerate(rows, start=start):
+        try:
+            parsed.append((number, schema.model_validate(row)))
+        except ValidationError as err:
+            conflicts.append(
+                schemas.ImportConflict(
+                    row=number,
+                    email=row.get("email") if isinstance(row, dict) else None,
+                    reason="; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                        for error in err.errors()
+                    ),
+                )
+            )
+    return parsed, conflicts
+
+
+def import_staff(
+    db: Session, rows: list[tuple[int, schemas.CreateStaff]]
+) -> tuple[list[models.Staff], list[schemas.ImportConflict]]:
+    """
+    Creates staff in bulk: one query for the emails already taken, the
+    passwords hashed in parallel, then multi-row inserts for the staff and
+    their workload rows in a single transaction. Rows that clash with an
+    existing account, an earlier row or an unknown role are skipped and
+    reported.
+    """
+    conflicts = []
+    emails = {staff.email for _, staff in rows}
+    taken = {
+        email
+        for (email,) in db.query(models.Staff.email).filter(
+            models.Staff.email.in_(emails)
+        )
+    }
+    roles = {role_id for (role_id,) in db.query(models.Role.id)}
+
+    accepted, seen = [], set()
+    for number, staff in rows:
+        if staff.email in taken:
+            reason = "Email already registered"
+        elif staff.email in seen:
+            reason = "Email appears earlier in the import"
+        elif staff.role not in roles:
+            reason = f"Role {staff.role} doesn't exist"
+        else:
+            seen.add(staff.email)
+            accepted.append((number, staff))
+            continue
+        conflicts.append(
+            schemas.ImportConflict(row=number, email=staff.email, reason=reason)
+        )
+
+    passwords = hashing.hash_passwords([staff.password for _, staff in accepted])
+
+    created_ids = []
+    for start in range(0, len(accepted), INSERT_BATCH_SIZE):
+        batch = accepted[start : start + INSERT_BATCH_SIZE]
+        # * a concurrent signup can still take an email, skip rather than fail
+        created_ids += db.scalars(
+            insert(models.Staff)
+            .values(
+                [
+                    {
+                        "email": staff.email,
+                        "fullname": staff.fullname,
+                        "department": staff.department,
+                        "hall_name": staff.hall,
+                        "password": password,
+                        "role_id": staff.role,
+                    }
+                    for (_, staff), password in zip(batch, passwords[start:])
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(models.Staff.id)
+        ).all()
+
+    for start in range(0, len(created_ids), INSERT_BATCH_SIZE):
+        db.execute(
+            insert(models.StaffWorkload).values(
+                [
+                    {"staff_id": staff_id, "open_complaints": 0}
+                    for staff_id in created_ids[start : start + INSERT_BATCH_SIZE]
+                ]
+            )
+        )
+    db.commit()
+    escalation.tree.invalidate()
+
+    created = (
+        db.query(models.Staff).filter(models.Staff.id.in_(created_ids)).all()
+        if created_ids
+        else []
+    )
+    created_emails = {staff.email for staff in created}
+    conflicts += [
+        schemas.ImportConflict(
+            row=number, email=staff.email, reason="Email already registered"
+        )
+        for number, staff in accepted
+        if staff.email not in created_emails
+    ]
+    return created, conflicts
+
+
+def _upsert_students(db: Session, values: list[dict]):
+    """
+    Inserts new students and refreshes the roster fields of existing ones,
+    keyed on matric number. An existing student's email, which they sign in
+    with, is never changed. Returns whether each row was inserted.
+    """
+    statement = insert(models.Student).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["matric_no"],
+        set_={
+            "fullname": func.coalesce(
+                statement.excluded.fullname, models.Student.fullname
+            ),
+            "department": statement.excluded.department,
+            "school": statement.excluded.school,
+            "hallname": func.coalesce(
+                statement.excluded.hallname, models.Student.hallname
+            ),
+            # * the roster never resets a password a student already set
+            "password": func.coalesce(
+                models.Student.password, statement.excluded.password
+            ),
+        },
+    )
+    # * xmax is 0 only on rows this statement inserted
+    return db.scalars(statement.returning(literal_column("xmax = 0"))).all()
+
+
+def import_students(db: Session, rows: Iterable[dict]) -> schemas.BulkImportResult:
+    """
+    Upserts a student roster `INSERT_BATCH_SIZE` rows at a time, committing
+    each batch, so rows are read, validated, hashed and written as they
+    stream in. A row is reported instead of imported when it fails
+    validation, repeats a matric number or email from an earlier row, uses
+    an email that belongs to a different student, or gives an existing
+    student a different email.
+    """
+    result = schemas.BulkImportResult(created=0)
+    seen_matric_nos, seen_emails = set(), set()
+    rows = iter(rows)
+
+    for start in itertools.count(1, INSERT_BATCH_SIZE):
+        batch = list(itertools.islice(rows, INSERT_BATCH_SIZE))
+        if not batch:
+            break
+        parsed, conflicts = parse_rows(batch, schemas.RosterStudent, start)
+
+        emails = {student.email for _, student in parsed if student.email}
+        owners = dict(
+            db.query(models.Student.email, models.Student.matric_no).filter(
+                models.Student.email.in_(emails)
+            )
+        )
+        registered_emails = dict(
+            db.query(models.Student.matric_no, models.Student.email).filter(
+                models.Student.matric_no.in_(
+                    {student.matric_no for _, student in parsed}
+                )
+            )
+        )
+
+        accepted = []
+        for number, student in parsed:
+            if student.matric_no in seen_matric_nos:
+                reason = "Matric number appears earlier in the import"
+            elif student.email and student.email in seen_emails:
+                reason = "Email appears earlier in the import"
+            elif owners.get(student.email, student.matric_no) != student.matric_no:
+                reason = "Email registered to another student"
+            elif (
+                student.email
+                and registered_emails.get(student.matric_no, student.email)
+                != student.email
+            ):
+                reason = "Email differs from the one the student is registered with"
+            else:
+                seen_matric_nos.add(student.matric_no)
+                if student.email:
+                    seen_emails.add(student.email)
+                accepted.append((number, student))
+                continue
+            conflicts.append(
+                schemas.ImportConflict(row=number, email=student.email, reason=reason)
+            )
+
+        passwords = hashing.hash_passwords(
+            [student.password for _, student in accepted]
+        )
+        values = [
+            {**student.model_dump(), "password": password}
+            for (_, student), password in zip(accepted, passwords)
+        ]
+
+        inserted = []
+        if values:
+            try:
+                with db.begin_nested():
+                    inserted = _upsert_students(db, values)
+            except IntegrityError:
+                # * a concurrent signup took one of the emails, find which
+                for (number, student), row in zip(accepted, values):
+                    try:
+                        with db.begin_nested():
+                            inserted += _upsert_students(db, [row])
+                    except IntegrityError:
+                        conflicts.append(
+                            schemas.ImportConflict(
+                                row=number,
+                                email=student.email,
+                                reason="Email registered to another student",
+                            )
+                        )
+        db.commit()
+
+        result.created += sum(inserted)
+        result.updated += len(inserted) - sum(inserted)
+        result.conflicts += sorted(conflicts, key=lambda conflict: conflict.row)
+
+    return result
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# * table -> partition key, every table is range partitioned per academic session
+PARTITIONED_TABLES = {
+    "complaints": "created_at",
+    "complaint_assignment": "assigned_at",
+    "notifications": "created_at",
+    "complaint_events": "created_at",
+}
+
+# * academic sessions run from September to the end of August
+SESSION_START_MONTH = 9
+
+
+def session_year(moment: datetime) -> int:
+    """Returns the year an academic session started in, 2024 for 2024/2025."""
+    return moment.year if moment.month >= SESSION_START_MONTH else moment.year - 1
+
+
+def session_bounds(year: int) -> tuple[datetime, datetime]:
+    return (
+        datetime(year, SESSION_START_MONTH, 1, tzinfo=timezone.utc),
+        datetime(year + 1, SESSION_START_MONTH, 1, tzinfo=timezone.utc),
+    )
+
+
+def partition_name(table: str, year: int) -> str:
+    return f"{table}_{year}_{year + 1}"
+
+
+def ensure_partitions(
+    connection: Connection,
+    first_year: int,
+    last_year: int,
+    tables=PARTITIONED_TABLES,
+):
+    """
+    Creates the session partitions from `first_year` to `last_year`. Rows that
+    already landed in a table's default partition for one of these sessions
+    are moved into the new partition before it is attached, otherwise Postgres
+    refuses to create it.
+    """
+    for table, key in tables.items():
+        for year in range(first_year, last_year + 1):
+            name = partition_name(table, year)
+            exists = connection.execute(
+                text("SELECT to_regclass(:name)"), {"name": name}
+            ).scalar()
+            if exists:
+                continue
+
+            start, end = session_bounds(year)
+            bounds = {"start": start, "end": end}
+            connection.execute(
+                text(
+                    f"CREATE TABLE {name} "
+                    f"(LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+            )
+            connection.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {table}_default "
+                    f"WHERE {key} >= :start AND {key} < :end RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            connection.execute(
+                text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
@@ -0,0 +1,158 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
+from . import oauth2
+from .config import settings
+
+
+class RateLimitBackend(ABC):
+    """Stores token buckets. `take` returns (allowed, seconds until a token)."""
+
+    @abstractmethod
+    def take(self, key: str, rate: float, capacity: int) -> tuple[bool, float]:
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: int) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                # * drop the oldest bucket, a full bucket is the same as none
+                self._buckets.pop(next(iter(self._buckets)))
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend(RateLimitBackend):
+    """Shares buckets between workers through Redis."""
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, capacity: int) -> tuple[bool, float]:
+        allowed, tokens = self._script(
+            keys=[f"ratelimit:{key}"], args=[rate, capacity, time.time()]
+        )
+        if allowed:
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+def get_backend() -> RateLimitBackend:
+    if settings.rate_limit_redis_url:
+        return RedisBackend(settings.rate_limit_redis_url)
+    return InMemoryBackend()
+
+
+backend = get_backend()
+
+
+def _client_ip(request: Request) -> str:
+    # * the proxy's X-Forwarded-For is applied by the server for trusted
+    # * proxies only, see forwarded_allow_ips
+    return request.client.host if request.client else "unknown"
+
+
+def _client_key(request: Request) -> str:
+    """Keys by the authenticated principal when there is one, else by IP."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = oauth2.decode_token(token, oauth2.ACCESS_TOKEN)
+            return f"{payload['user_type']}:{payload['id']}"
+        except (InvalidTokenError, KeyError):
+            pass
+    return f"ip:{_client_ip(request)}"
+
+
+def _take(key: str, rate: float, capacity: int):
+    allowed, retry_after = backend.take(key, rate, capacity)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+class RateLimit:
+    """
+    Route dependency enforcing a token bucket of `capacity` requests refilled
+    at `per_minute` requests per minute, per principal (or IP) and route.
+    """
+
+    def __init__(self, route: str, per_minute: float, capacity: int):
+        self.route = route
+        self.rate = per_minute / 60
+        self.capacity = capacity
+
+    def __call__(self, request: Request):
+        _take(f"{self.route}:{_client_key(request)}", self.rate, self.capacity)
+
+
+class LoginRateLimit:
+    """
+    Login throttle keyed by the submitted username, so guessing one
+    account's password is slowed wherever the attempts come from. The
+    per-IP bucket is much looser: students behind the campus NAT or the
+    platform's router share a handful of addresses, so it only stops floods.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        per_minute: float,
+        capacity: int,
+        ip_per_minute: float,
+        ip_capacity: int,
+    ):
+        self.route = route
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.ip_rate = ip_per_minute / 60
+        self.ip_capacity = ip_capacity
+
+    def __call__(
+        self,
+        request: Request,
+        credentials: OAuth2PasswordRequestForm = Depends(),
+    ):
+        _take(f"{self.route}:ip:{_client_ip(request)}", self.ip_rate, self.ip_capacity)
+        username = credentials.username.strip().lower()
+        _take(f"{self.route}:user:{username}", self.rate, self.capacity)
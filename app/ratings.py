@@ -0,0 +1,76 @@
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from . import models
+from .config import settings
+
+
+def bayesian_score(rating_count: int, rating_sum: int) -> float:
+    prior_weight = settings.rating_prior_weight
+    return (prior_weight * settings.rating_prior_mean + rating_sum) / (
+        prior_weight + rating_count
+    )
+
+
+def record_rating(db: Session, staff_id: int, rating: int):
+    """
+    Folds one rating into the staff member's aggregates with a single upsert,
+    so the score never has to be recomputed from the ratings table. The
+    caller commits.
+    """
+    prior_weight = settings.rating_prior_weight
+    prior_total = prior_weight * settings.rating_prior_mean
+    score = models.StaffScore
+    db.execute(
+        insert(score)
+        .values(
+            staff_id=staff_id,
+            rating_count=1,
+            rating_sum=rating,
+            mean=float(rating),
+            score=bayesian_score(1, rating),
+        )
+        .on_conflict_do_update(
+            index_elements=[score.staff_id],
+            set_={
+                "rating_count": score.rating_count + 1,
+                "rating_sum": score.rating_sum + rating,
+                "mean": (score.rating_sum + rating) * 1.0 / (score.rating_count + 1),
+                "score": (prior_total + score.rating_sum + rating)
+                / (prior_weight + score.rating_count + 1),
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def staff_score(db: Session, staff_id: int) -> models.StaffScore:
+    """Primary key lookup, staff without ratings get the prior."""
+    return db.get(models.StaffScore, staff_id) or models.StaffScore(
+        staff_id=staff_id,
+        rating_count=0,
+        rating_sum=0,
+        mean=0.0,
+        score=settings.rating_prior_mean,
+    )
+
+
+def score_column():
+    """Per-candidate score for assignment queries, one primary key probe per row."""
+    return func.coalesce(
+        select(models.StaffScore.score)
+        .where(models.StaffScore.staff_id == models.Staff.id)
+        .scalar_subquery(),
+        settings.rating_prior_mean,
+    )
+
+
+def assignment_order():
+    """
+    Least loaded staff first. With `assignment_score_weight` set, every point
+    of score offsets that many open complaints.
+    """
+    workload = models.StaffWorkload.open_complaints
+    if not settings.assignment_score_weight:
+        return workload.asc()
+    return (workload - settings.assignment_score_weight * score_column()).asc()
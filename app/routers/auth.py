@@ -1,10 +1,10 @@
 import time
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
 from sqlalchemy.orm import Session
-from google.oauth2 import id_token
-from google.auth.transport import requests
-from .. import models, utils, oauth2, schemas
+from .. import google_auth, models, utils, oauth2, schemas
+from ..ratelimit import LoginRateLimit
 from ..database import get_db
 from ..config import settings
 from ..schemas import ResponseModel
@@ -12,7 +12,21 @@ from ..schemas import ResponseModel
 router = APIRouter(tags=["Authentication"])
 
 
-@router.post("/student/login", response_model=ResponseModel[schemas.LoginResponse])
+@router.post(
+    "/student/login",
+    response_model=ResponseModel[schemas.LoginResponse],
+    dependencies=[
+        Depends(
+            LoginRateLimit(
+                "student-login",
+                per_minute=10,
+                capacity=5,
+                ip_per_minute=600,
+                ip_capacity=200,
+            )
+        )
+    ],
+)
 def student_login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
@@ -33,20 +47,30 @@ def student_login(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
 
-    # * create access token
-    access_token = oauth2.create_access_token(data={"sub": user.email})
-    data = schemas.LoginResponse(
-        access_token=access_token,
-        token_type="bearer",
-        student=user,
-    )
+    # * create access and refresh tokens
+    tokens = oauth2.create_token_pair(oauth2.student_claims(user))
+    data = schemas.LoginResponse(**tokens, student=user)
     return ResponseModel(
         metadata=schemas.Metadata(status_code=200, success=True),
         data=data,
     )
 
 
-@router.post("/staff/login", response_model=ResponseModel[schemas.StaffLoginResponse])
+@router.post(
+    "/staff/login",
+    response_model=ResponseModel[schemas.StaffLoginResponse],
+    dependencies=[
+        Depends(
+            LoginRateLimit(
+                "staff-login",
+                per_minute=10,
+                capacity=5,
+                ip_per_minute=600,
+                ip_capacity=200,
+            )
+        )
+    ],
+)
 def staff_login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
@@ -67,11 +91,10 @@ def staff_login(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
 
-    # * create access token
-    access_token = oauth2.create_access_token(data={"sub": user.email})
+    # * create access and refresh tokens
+    tokens = oauth2.create_token_pair(oauth2.staff_claims(user))
     data = schemas.StaffLoginResponse(
-        access_token=access_token,
-        token_type="bearer",
+        **tokens,
         staff=schemas.Staff.model_validate(user),
     )
     return ResponseModel(
@@ -85,11 +108,7 @@ def verify_staff_google_token(
     token_data: schemas.GoogleToken, db: Session = Depends(get_db)
 ):
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token_data.token, requests.Request(), settings.google_client_id
-        )
-        if idinfo["iss"] not in ["accounts.google.com", "https://accounts.google.com"]:
-            raise ValueError("Wrong issuer.")
+        idinfo = google_auth.verify_google_token(token_data.token)
 
         staff_email = idinfo["email"]
         staff_fullname = idinfo["name"]
@@ -106,10 +125,8 @@ def verify_staff_google_token(
             db.commit()
             db.refresh(staff)
 
-            # * generate access token
-            access_token = oauth2.create_access_token(data={"sub": staff.email})
-
-            return {"access_token": access_token, "token_type": "bearer"}
+            # * generate access and refresh tokens
+            return oauth2.create_token_pair(oauth2.staff_claims(staff))
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -123,14 +140,9 @@ def google_student_login(
 ):
     """Login students using Google OAuth if they already exist."""
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token_data.token, requests.Request(), settings.google_client_id
-        )
+        idinfo = google_auth.verify_google_token(token_data.token)
 
         # Validate token
-        if idinfo["iss"] not in ["accounts.google.com", "https://accounts.google.com"]:
-            raise ValueError("Wrong issuer.")
-
         if idinfo["aud"] != settings.google_client_id:
             raise ValueError("Invalid audience.")
 
@@ -156,13 +168,9 @@ def google_student_login(
                 detail="Student not found. Please sign up first.",
             )
 
-        # Generate access token
-        access_token = oauth2.create_access_token(data={"sub": student.email})
-        data = schemas.LoginResponse(
-            access_token=access_token,
-            token_type="bearer",  # Standard OAuth token type
-            student=student,
-        )
+        # Generate access and refresh tokens
+        tokens = oauth2.create_token_pair(oauth2.student_claims(student))
+        data = schemas.LoginResponse(**tokens, student=student)
 
         return ResponseModel(
             metadata=schemas.Metadata(status_code=200, success=True),
@@ -188,12 +196,8 @@ def google_student_signup(
     print(token_data)
     """Sign up students using Google OAuth if they don’t exist."""
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token_data.token, requests.Request(), settings.google_client_id
-        )
+        idinfo = google_auth.verify_google_token(token_data.token)
         print("Decoded Token: ", idinfo)
-        if idinfo["iss"] not in ["accounts.google.com", "https://accounts.google.com"]:
-            raise ValueError("Wrong issuer.")
 
         student_email = idinfo["email"]
         student_fullname = idinfo["name"]
@@ -216,13 +220,76 @@ def google_student_signup(
         db.commit()
         db.refresh(student)
 
-        # * Generate access token
-        access_token = oauth2.create_access_token(data={"sub": student.email})
-
-        return {"access_token": access_token, "token_type": "bearer"}
+        # * Generate access and refresh tokens
+        return oauth2.create_token_pair(oauth2.student_claims(student))
 
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid token: {e}",
         )
+
+
+@router.post("/token/refresh", response_model=ResponseModel[schemas.TokenPair])
+def refresh_access_token(
+    token_data: schemas.RefreshToken, db: Session = Depends(get_db)
+):
+    try:
+        payload = oauth2.decode_token(token_data.refresh_token, oauth2.REFRESH_TOKEN)
+    except InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # * re-read the user so role and department changes land in the new claims
+    if payload["user_type"] == oauth2.STAFF:
+        user = db.query(models.Staff).filter(models.Staff.id == payload["id"]).first()
+        claims = oauth2.staff_claims(user) if user else None
+    else:
+        user = (
+            db.query(models.Student).filter(models.Student.id == payload["id"]).first()
+        )
+        claims = oauth2.student_claims(user) if user else None
+
+    if not claims:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User no longer exists",
+        )
+
+    # * refresh tokens are single use, across every worker
+    if not oauth2.revocation_list.revoke(payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has already been used",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=schemas.TokenPair(**oauth2.create_token_pair(claims)),
+    )
+
+
+@router.post("/logout")
+def logout(token_data: schemas.RefreshToken, all_sessions: bool = False):
+    """Revokes the refresh token, or every token of the user with `all_sessions`."""
+    try:
+        payload = oauth2.decode_token(token_data.refresh_token, oauth2.REFRESH_TOKEN)
+    except InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+
+    if all_sessions:
+        oauth2.revocation_list.revoke_user(payload["user_type"], payload["id"])
+    else:
+        oauth2.revocation_list.revoke(payload)
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data={"message": "Logged out"},
+    )
@@ -1,10 +1,41 @@
+import json
 import logging
-from datetime import datetime
-from typing import Annotated
-from fastapi import APIRouter, Depends, Form, HTTPException, Query, UploadFile, status
-from sqlalchemy import func
+from datetime import datetime, timezone
+from typing import Annotated, Literal
+from fastapi import (
+    APIRouter,
+    Depends,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from .. import database, models, oauth2, schemas, utils
+from .. import (
+    cache,
+    categorization,
+    database,
+    duplicates,
+    escalation,
+    events,
+    export,
+    idempotency,
+    models,
+    notifications,
+    oauth2,
+    ratings,
+    routing,
+    schemas,
+    storage,
+    utils,
+    workload,
+)
+from ..ratelimit import RateLimit
+from .uploads import attachment_key, attachment_prefix
 from ..schemas import ResponseModel
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -12,76 +43,90 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/complaint", tags=["complaints"])
 
+EXPORT_FORMATS = {
+    "csv": (export.to_csv, "text/csv"),
+    "jsonl": (export.to_jsonl, "application/x-ndjson"),
+    "parquet": (export.to_parquet, "application/vnd.apache.parquet"),
+}
+
 
 def create_complaint(
     title: str,
     description: str,
     category_id: int,
     priority_id: int,
-    student: schemas.Student,
+    student: schemas.StudentPrincipal,
     db: Session,
     file: UploadFile | None = None,
+    file_url: str | None = None,
 ):
     # * 1 - Hall, 2 - Course, 3 - Bursary
     try:
+        # * near-duplicates of an open complaint share its assignment
+        scope = duplicates.duplicate_scope(category_id, student)
+        duplicates.index.sync(db)
+        parent_id = duplicates.index.find(scope, title, description)
 
         if file:
-            upload_result = utils.upload_file(
-                file=file,
-                type="image",
-                public_id=file.filename,
-                folder="complaints",
+            file_url = storage.backend.put(
+                attachment_key(student.id, file.filename), file.file, file.content_type
             )
-            print(upload_result)
 
-            complaint = models.Complaint(
-                student_id=student.id,
-                category_id=category_id,
-                priority_id=priority_id,
-                title=title,
-                description=description,
-                file_url=upload_result["secure_url"],
-                status="pending",
-            )
-        else:
-            complaint = models.Complaint(
-                student_id=student.id,
-                category_id=category_id,
-                priority_id=priority_id,
-                title=title,
-                description=description,
-                status="pending",
-            )
+        complaint = models.Complaint(
+            student_id=student.id,
+            category_id=category_id,
+            priority_id=priority_id,
+            title=title,
+            description=description,
+            file_url=file_url,
+            status="pending",
+            parent_id=parent_id,
+        )
 
+        # * the complaint, its assignment and the notification commit together
         db.add(complaint)
-        db.commit()
-        db.refresh(complaint)
+        db.flush()
 
-        complaint = (
-            db.query(models.Complaint)
-            .join(
-                models.ComplaintCategory,
-                models.Complaint.category_id == models.ComplaintCategory.id,
-                isouter=True,
-            )
-            .join(
-                models.ComplaintType,
-                models.Complaint.category_id == models.ComplaintType.category_id,
-                isouter=True,
-            )
-            .join(
-                models.Priorities, models.Complaint.priority_id == models.Priorities.id
+        # * Assign a staff to the complaint
+        parent_staff_id = link_to_parent(db, complaint) if parent_id else None
+        indexed = parent_staff_id is None
+        if parent_id and indexed:
+            # * the parent was closed meanwhile, so this isn't a duplicate
+            duplicates.index.remove(parent_id)
+            complaint.parent_id = None
+        assignment = None
+        if indexed:
+            result = least_work_load_complaint_assigner(db, student, complaint)
+            assignment = result["assignment"] if result else None
+
+        events.record(
+            db,
+            complaint.id,
+            events.EventType.CREATED,
+            events.ActorType.STUDENT,
+            student.id,
+        )
+        if assignment or not indexed:
+            events.record(
+                db,
+                complaint.id,
+                events.EventType.ASSIGNED,
+                events.ActorType.SYSTEM,
+                staff_id=assignment.staff_id if assignment else parent_staff_id,
+                detail=None if assignment else f"Linked to {complaint.parent_id}",
             )
-            .filter(models.Complaint.student_id == student.id)
-            .filter(models.Complaint.id == complaint.id)
-            .first()
+        db.commit()
+        cache.complaint_lists.invalidate(
+            cache.student_key(student.id),
+            cache.hall_key(student.hallname),
+            cache.department_key(student.department),
+            cache.staff_key(assignment.staff_id if assignment else None),
         )
-
-        # * Assign a staff to the complaint
-        result = least_work_load_complaint_assigner(db, student, complaint)
-        complaint = result["complaint"]
-        assignment = result["assignment"]
-        print(assignment)
+        db.refresh(complaint)
+        if assignment:
+            db.refresh(assignment)
+        if indexed:
+            duplicates.index.add(scope, complaint.id, title, description)
 
         validated_complaint = schemas.Complaints(
             id=complaint.id,
@@ -95,6 +140,7 @@ def create_complaint(
             file_url=complaint.file_url,
             status=complaint.status,
             complaint_assignment=assignment,
+            parent_id=complaint.parent_id,
             created_at=complaint.created_at,
         )
 
@@ -109,134 +155,91 @@ def create_complaint(
         )
 
 
-def least_work_load_complaint_assigner(
-    db: Session, student: schemas.Student, complaint: models.Complaint
-):
-    try:
-        staff_role_id = utils.get_staff_role_id_from_complaint(complaint)
-        logger.info(f"Staff role id is {staff_role_id}")
-
-        staff = (
-            db.query(models.Staff)
-            .filter(models.Staff.hall_name == "Nelson Mandela")
-            .first()
+def link_to_parent(db: Session, complaint: models.Complaint) -> int | None:
+    """
+    Links a duplicate complaint to its open parent and returns the staff
+    member handling the parent. The duplicate gets no assignment of its own:
+    it stays out of workloads, the work queue and staff lists, and is
+    resolved when the parent is closed. The parent is locked so it can't be
+    closed concurrently; if it is already resolved None is returned.
+    """
+    parent_assignment = (
+        db.query(models.ComplaintAssignment)
+        .join(
+            models.Complaint,
+            models.Complaint.id == models.ComplaintAssignment.complaint_id,
         )
-        print(f"Staff {student.hallname}")
+        .filter(models.ComplaintAssignment.complaint_id == complaint.parent_id)
+        .filter(models.ComplaintAssignment.status != "resolved")
+        .filter(models.Complaint.status != "resolved")
+        .with_for_update(of=models.Complaint)
+        .first()
+    )
+    if not parent_assignment:
+        return None
 
-        if complaint.category_id == 1:
-            # Hall-specific complaints
-            result = (
-                db.query(
-                    models.Staff,
-                    func.count(models.ComplaintAssignment.id).label("complaint_count"),
-                )
-                .outerjoin(models.ComplaintAssignment)
-                .join(models.Student, models.Student.id == complaint.student_id)
-                .filter(models.Staff.role_id == staff_role_id)
-                .filter(models.Staff.hall_name == student.hallname)
-                .group_by(models.Staff.id)
-                .order_by(func.count(models.ComplaintAssignment.id).asc())
-                .first()
-            )
+    complaint.status = "assigned"
+    db.add(complaint)
 
-            staff_member = result[0] if result else None
+    return parent_assignment.staff_id
 
-            if not staff_member:
-                logger.info("No staff found in the same hall, using fallback.")
-                print("No staff found in the same hall, using fallback.")
-                fallback_result = (
-                    db.query(
-                        models.Staff,
-                        func.count(models.ComplaintAssignment.id).label(
-                            "complaint_count"
-                        ),
-                    )
-                    .outerjoin(models.ComplaintAssignment)
-                    .filter(models.Staff.role_id == staff_role_id)
-                    .group_by(models.Staff.id)
-                    .order_by(func.count(models.ComplaintAssignment.id).asc())
-                    .first()
-                )
-                staff_member = fallback_result[0] if fallback_result else None
-
-        elif complaint.category_id == 2:
-            # Department-specific complaints
-            result = (
-                db.query(
-                    models.Staff,
-                    func.count(models.ComplaintAssignment.id).label("complaint_count"),
-                )
-                .outerjoin(models.ComplaintAssignment)
-                .join(models.Student, models.Student.id == complaint.student_id)
-                .filter(models.Staff.role_id == staff_role_id)
-                .filter(models.Staff.department == student.department)
-                # .group_by(models.Staff.id)
-                .order_by(func.count(models.ComplaintAssignment.id).asc())
-                .first()
-            )
 
-            staff_member = result[0] if result else None
+def pick_staff(
+    db: Session, category_id: int, student: schemas.StudentPrincipal
+) -> models.StaffWorkload | None:
+    """Locks the workload row of the least loaded staff the category routes to."""
+    routing.table.refresh(db)
+    # * try each rule of the category's chain until one has staff
+    for criteria in routing.table.candidates(category_id, student):
+        staff_workload = workload.lock_least_loaded(db, *criteria)
+        if staff_workload:
+            return staff_workload
+    return None
 
-            if not staff_member:
-                logger.info("No staff found in the same department, using fallback.")
-                print("No staff found in the same department, using fallback.")
-                fallback_result = (
-                    db.query(
-                        models.Staff,
-                        func.count(models.ComplaintAssignment.id).label(
-                            "complaint_count"
-                        ),
-                    )
-                    .outerjoin(models.ComplaintAssignment)
-                    .filter(models.Staff.role_id == staff_role_id)
-                    .group_by(models.Staff.id)
-                    .order_by(func.count(models.ComplaintAssignment.id).asc())
-                    .first()
-                )
-                staff_member = fallback_result[0] if fallback_result else None
 
-        else:
-            # General case: Assign to any staff with the least workload
-            result = (
-                db.query(
-                    models.Staff,
-                    func.count(models.ComplaintAssignment.id).label("complaint_count"),
-                )
-                .outerjoin(models.ComplaintAssignment)
-                .filter(models.Staff.role_id == staff_role_id)
-                .group_by(models.Staff.id)
-                .order_by(func.count(models.ComplaintAssignment.id).asc())
-                .first()
-            )
-            staff_member = result[0] if result else None
+def least_work_load_complaint_assigner(
+    db: Session, student: schemas.StudentPrincipal, complaint: models.Complaint
+):
+    """
+    Assigns the complaint to the least loaded matching staff member and
+    queues their notification. Nothing is committed here, the caller commits
+    the complaint, assignment and notification together, which also releases
+    the workload row lock.
+    """
+    try:
+        staff_workload = pick_staff(db, complaint.category_id, student)
 
-        logger.info(f"Selected staff member: {staff_member}")
+        logger.info(
+            f"Selected staff member: {staff_workload and staff_workload.staff_id}"
+        )
 
-        if not staff_member:
-            logger.warning("No suitable staff member found for assignment")
+        if not staff_workload:
+            logger.warning(
+                f"No staff matches the routes of category {complaint.category_id}, "
+                f"complaint {complaint.id} stays pending"
+            )
             return None
 
         # Update complaint status
         complaint.status = "assigned"
+        staff_workload.open_complaints += 1
 
         # Assign complaint
         assignment = models.ComplaintAssignment(
             complaint_id=complaint.id,
-            staff_id=staff_member.id,
+            staff_id=staff_workload.staff_id,
             status="assigned",
         )
 
         db.add(complaint)
         db.add(assignment)
-        db.commit()
-        db.refresh(complaint)
-        db.refresh(assignment)
-
-        try:
-            # Implement notification logic here
-            pass
-        except Exception as e:
-            logger.error(f"Failed to send notification: {str(e)}")
+        notifications.create_notification(
+            db,
+            oauth2.STAFF,
+            staff_workload.staff_id,
+            complaint.id,
+            f"New complaint assigned to you: {complaint.title}",
+        )
 
         return {"assignment": assignment, "complaint": complaint}
 
@@ -249,43 +252,186 @@ def least_work_load_complaint_assigner(
         raise
 
 
-def escalate_complaint(db: Session, department: str, complaint_id: int):
-    # Find the admin in the specified department with the least number of complaint assignments
-    admin = (
-        db.query(models.Staff)
-        .filter(models.Staff.role_id == 1)  # Ensure role is admin
-        .join(models.ComplaintAssignment)
-        .group_by(models.Staff.id)
-        .filter(models.Staff.department == department)  # Fix filter for department
-        .order_by(func.count(models.ComplaintAssignment.id))
+@categorization.on_categorized
+def apply_category(complaint_ids: list[str], category_id: int):
+    """
+    Moves complaints the background categorization put in another category
+    than the student picked, re-routing those no staff has started on yet.
+    """
+    with database.SessionLocal() as db:
+        for complaint_id in complaint_ids:
+            complaint = (
+                db.query(models.Complaint)
+                .filter(models.Complaint.id == complaint_id)
+                .with_for_update()
+                .first()
+            )
+            if not complaint or complaint.category_id == category_id:
+                continue
+
+            stale_keys = cache.complaint_keys(db, complaint_id)
+            complaint.category_id = category_id
+            staff_id = reroute_complaint(db, complaint)
+            db.commit()
+            cache.complaint_lists.invalidate(*stale_keys, cache.staff_key(staff_id))
+
+
+def reroute_complaint(db: Session, complaint: models.Complaint) -> int | None:
+    """
+    Routes a recategorized complaint again. Duplicates keep their parent's
+    staff and complaints that are responded to or claimed from the work queue
+    stay where they are. Returns the newly assigned staff id, if any. The
+    caller commits.
+    """
+    if complaint.parent_id or complaint.status not in ("pending", "assigned"):
+        return None
+
+    assignment = (
+        db.query(models.ComplaintAssignment)
+        .filter(models.ComplaintAssignment.complaint_id == complaint.id)
         .first()
     )
+    if assignment and (
+        assignment.status != "assigned"
+        or (
+            assignment.leased_until
+            and assignment.leased_until > datetime.now(timezone.utc)
+        )
+    ):
+        return None
+
+    student_row = db.get(models.Student, complaint.student_id)
+    student = schemas.StudentPrincipal(
+        id=student_row.id,
+        email=student_row.email or "",
+        department=student_row.department,
+        hallname=student_row.hallname,
+    )
+
+    if not assignment:
+        result = least_work_load_complaint_assigner(db, student, complaint)
+        if not result:
+            return None
+        staff_id = result["assignment"].staff_id
+        events.record(
+            db,
+            complaint.id,
+            events.EventType.ASSIGNED,
+            events.ActorType.SYSTEM,
+            staff_id=staff_id,
+        )
+        return staff_id
+
+    # * without staff in the new category it stays with the current one
+    staff_workload = pick_staff(db, complaint.category_id, student)
+    if not staff_workload or staff_workload.staff_id == assignment.staff_id:
+        return None
+
+    workload.add_open(db, assignment.staff_id, -1)
+    staff_workload.open_complaints += 1
+    assignment.staff_id = staff_workload.staff_id
+    assignment.assigned_at = datetime.now()
+    notifications.create_notification(
+        db,
+        oauth2.STAFF,
+        staff_workload.staff_id,
+        complaint.id,
+        f"New complaint assigned to you: {complaint.title}",
+    )
+    events.record(
+        db,
+        complaint.id,
+        events.EventType.REASSIGNED,
+        events.ActorType.SYSTEM,
+        staff_id=staff_workload.staff_id,
+        detail="Recategorized",
+    )
+    return staff_workload.staff_id
+
+
+def escalate_complaint(
+    db: Session, complaint_id: str, staff: schemas.StaffPrincipal, levels: int = 1
+):
+    """
+    Moves the complaint `levels` up the reporting chain of its current
+    assignee, to the least loaded of the manager at that level and their
+    peers.
+    """
+    complaint_assignment = (
+        db.query(models.ComplaintAssignment)
+        .filter(models.ComplaintAssignment.complaint_id == complaint_id)
+        .first()
+    )
+
+    if not complaint_assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Complaint with id {complaint_id} has no assignment",
+        )
+
+    escalation.tree.refresh(db)
+    candidates = escalation.tree.escalation_candidates(
+        complaint_assignment.staff_id, levels
+    )
+
+    if not candidates:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Complaint can't be escalated any further",
+        )
+
+    staff_workload = workload.lock_least_loaded(db, models.Staff.id.in_(candidates))
 
-    if not admin:
+    if not staff_workload:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No Admin available for this department",
+            detail="No staff available to escalate to",
         )
 
-    # Create an assignment for the escalation
-    assignment = models.ComplaintAssignment(
-        complaint_id=complaint_id,
-        staff_id=admin.id,
-        assigned_at=datetime.now(),
-        status="escalated",
+    # * the list of the staff member losing the complaint changes too
+    stale_keys = cache.complaint_keys(db, complaint_id)
+
+    if complaint_assignment.status != "resolved":
+        workload.add_open(db, complaint_assignment.staff_id, -1)
+    staff_workload.open_complaints += 1
+
+    complaint_assignment.staff_id = staff_workload.staff_id
+    complaint_assignment.status = "escalated"
+    complaint_assignment.assigned_at = datetime.now()
+    complaint_assignment.leased_until = None
+    notifications.create_notification(
+        db,
+        oauth2.STAFF,
+        staff_workload.staff_id,
+        complaint_id,
+        f"A complaint has been escalated to you by staff {staff.id}",
+    )
+    events.record(
+        db,
+        complaint_id,
+        events.EventType.ESCALATED,
+        events.ActorType.STAFF,
+        staff.id,
+        staff_id=staff_workload.staff_id,
+        value=levels,
     )
-    db.add(assignment)
     db.commit()
-    db.refresh(assignment)  # Ensure the new assignment is refreshed
+    cache.complaint_lists.invalidate(
+        *stale_keys, cache.staff_key(staff_workload.staff_id)
+    )
+    db.refresh(complaint_assignment)
 
     return {
         "message": "Complaint has been successfully escalated",
-        "assignment": assignment,
+        "assignment": complaint_assignment,
     }
 
 
 def respond_to_complaint(
-    complaint_id: int, complaint_response: schemas.ComplaintResponse, db: Session
+    complaint_id: str,
+    complaint_response: schemas.ComplaintResponse,
+    db: Session,
+    staff: schemas.StaffPrincipal,
 ):
     db.query(models.Complaint).filter(models.Complaint.id == complaint_id).update(
         {"status": complaint_response.status}
@@ -293,7 +439,15 @@ def respond_to_complaint(
     db.query(models.ComplaintAssignment).filter(
         models.ComplaintAssignment.complaint_id == complaint_id
     ).update({"response": complaint_response.response})
+    events.record_response(
+        db,
+        complaint_id,
+        staff.id,
+        complaint_response.status,
+        complaint_response.response,
+    )
     db.commit()
+    cache.complaint_lists.invalidate(*cache.complaint_keys(db, complaint_id))
 
     complaint = (
         db.query(models.Complaint)
@@ -364,7 +518,7 @@ def respond_to_complaint(
     )
 
 
-def close_complaint(complaint_id: str, staff: schemas.Staff, db: Session):
+def close_complaint(complaint_id: str, staff: schemas.StaffPrincipal, db: Session):
     complaint_assignment = (
         db.query(models.ComplaintAssignment)
         .filter(models.ComplaintAssignment.complaint_id == complaint_id)
@@ -384,9 +538,12 @@ def close_complaint(complaint_id: str, staff: schemas.Staff, db: Session):
     #         detail="You are not authorized to close this complaint",
     #     )
 
-    # Fetch the complaint
+    # * locked so no new duplicate links to it while it is being closed
     complaint = (
-        db.query(models.Complaint).filter(models.Complaint.id == complaint_id).first()
+        db.query(models.Complaint)
+        .filter(models.Complaint.id == complaint_id)
+        .with_for_update()
+        .first()
     )
 
     if not complaint:
@@ -400,10 +557,63 @@ def close_complaint(complaint_id: str, staff: schemas.Staff, db: Session):
     complaint.closed_by = staff.id
 
     # Update the assignment status and resolved_at timestamp
+    if complaint_assignment.status != "resolved":
+        workload.add_open(db, complaint_assignment.staff_id, -1)
     complaint_assignment.status = "resolved"
     complaint_assignment.resolved_at = datetime.utcnow()
 
+    # * duplicates linked to this complaint are resolved along with it
+    open_duplicate_complaints = (
+        db.query(
+            models.Complaint.id,
+            models.Complaint.student_id,
+            models.Complaint.title,
+        )
+        .filter(models.Complaint.parent_id == complaint_id)
+        .filter(models.Complaint.status != "resolved")
+        .all()
+    )
+    db.query(models.Complaint).filter(
+        models.Complaint.parent_id == complaint_id
+    ).update({"status": "resolved", "closed_by": staff.id}, synchronize_session=False)
+
+    notifications.create_notification(
+        db,
+        oauth2.STUDENT,
+        complaint.student_id,
+        complaint.id,
+        f"Your complaint has been resolved: {complaint.title}",
+    )
+    # * resolution stats go to the assignee, not whoever closed it
+    events.record(
+        db,
+        complaint.id,
+        events.EventType.RESOLVED,
+        events.ActorType.STAFF,
+        staff.id,
+        staff_id=complaint_assignment.staff_id,
+        value=events.seconds_since(complaint.created_at),
+        detail=complaint_assignment.response,
+    )
+    for duplicate in open_duplicate_complaints:
+        notifications.create_notification(
+            db,
+            oauth2.STUDENT,
+            duplicate.student_id,
+            duplicate.id,
+            f"Your complaint has been resolved: {duplicate.title}",
+        )
+        events.record(
+            db,
+            duplicate.id,
+            events.EventType.RESOLVED,
+            events.ActorType.STAFF,
+            staff.id,
+            detail=f"Resolved with {complaint.id}",
+        )
     db.commit()
+    cache.complaint_lists.invalidate(*cache.complaint_keys(db, complaint_id))
+    duplicates.index.remove(complaint_id)
     db.refresh(complaint)
     db.refresh(complaint_assignment)
 
@@ -449,93 +659,12 @@ def close_complaint(complaint_id: str, staff: schemas.Staff, db: Session):
 
 @router.get("/")
 def get_all_complaints(
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
-    db: Session = Depends(database.get_db),
+    request: Request,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
 ):
-    base_query = (
-        db.query(models.Complaint)
-        .options(
-            joinedload(models.Complaint.category),
-            joinedload(models.Complaint.assignment),
-        )
-        .join(
-            models.ComplaintCategory,
-            models.Complaint.category_id == models.ComplaintCategory.id,
-            isouter=True,
-        )
-        .join(
-            models.ComplaintType,
-            models.Complaint.category_id == models.ComplaintType.category_id,
-            isouter=True,
-        )
-        .join(
-            models.ComplaintAssignment,
-            models.Complaint.id == models.ComplaintAssignment.complaint_id,
-            isouter=True,
-        )
-        .join(models.Priorities, models.Complaint.priority_id == models.Priorities.id)
-        .join(models.Student, models.Student.id == models.Complaint.student_id)
-        .order_by(models.Complaint.created_at.desc())
-    )
-
-    if staff.department == "Hall":
-        complaints = base_query.filter(models.Student.hallname == staff.hall_name).all()
-    else:
-        complaints = base_query.filter(
-            models.Student.department == staff.department
-        ).all()
-
-    data = [
-        schemas.Complaints(
-            id=complaint.id,
-            student_id=complaint.student_id,
-            category=schemas.ComplaintCategory(
-                id=complaint.category.id,
-                name=complaint.category.name,
-            ),
-            priority_id=complaint.priority_id,
-            title=complaint.title,
-            description=complaint.description,
-            file_url=complaint.file_url,
-            status=complaint.status,
-            complaint_assignment=(
-                schemas.ComplaintAssignment(
-                    id=complaint.assignment.id,
-                    staff=complaint.assignment.staff,
-                    complaint_id=complaint.assignment.complaint_id,
-                    status=complaint.assignment.status,
-                    response=complaint.assignment.response,
-                    internal_notes=complaint.assignment.internal_notes,
-                    assigned_at=complaint.assignment.assigned_at,
-                    updated_at=complaint.assignment.updated_at,
-                    resolved_at=complaint.assignment.resolved_at,
-                )
-                if complaint.assignment is not None
-                else None
-            ),
-            created_at=complaint.created_at,
-        )
-        for complaint in complaints
-    ]
-
-    return ResponseModel(
-        metadata=schemas.Metadata(status_code=200, success=True),
-        data=data,
-    )
-
-
-@router.get(
-    "/students",
-    status_code=status.HTTP_200_OK,
-    response_model=ResponseModel[list[schemas.Complaints]],
-)
-def get_current_student_complaints(
-    search: str | None = None,
-    student: schemas.Student = Depends(oauth2.get_current_student),
-    db: Session = Depends(database.get_db),
-):
-    if not search:
-        complaints: list = (
+    def load():
+        base_query = (
             db.query(models.Complaint)
             .options(
                 joinedload(models.Complaint.category),
@@ -559,12 +688,135 @@ def get_current_student_complaints(
             .join(
                 models.Priorities, models.Complaint.priority_id == models.Priorities.id
             )
-            .filter(models.Complaint.student_id == student.id)
+            .join(models.Student, models.Student.id == models.Complaint.student_id)
             .order_by(models.Complaint.created_at.desc())
-            .all()
         )
+
+        if staff.department == "Hall":
+            complaints = base_query.filter(
+                models.Student.hallname == staff.hall_name
+            ).all()
+        else:
+            complaints = base_query.filter(
+                models.Student.department == staff.department
+            ).all()
+
+        return [
+            schemas.Complaints(
+                id=complaint.id,
+                student_id=complaint.student_id,
+                category=schemas.ComplaintCategory(
+                    id=complaint.category.id,
+                    name=complaint.category.name,
+                ),
+                priority_id=complaint.priority_id,
+                title=complaint.title,
+                description=complaint.description,
+                file_url=complaint.file_url,
+                status=complaint.status,
+                complaint_assignment=(
+                    schemas.ComplaintAssignment(
+                        id=complaint.assignment.id,
+                        staff=complaint.assignment.staff,
+                        complaint_id=complaint.assignment.complaint_id,
+                        status=complaint.assignment.status,
+                        response=complaint.assignment.response,
+                        internal_notes=complaint.assignment.internal_notes,
+                        assigned_at=complaint.assignment.assigned_at,
+                        updated_at=complaint.assignment.updated_at,
+                        resolved_at=complaint.assignment.resolved_at,
+                    )
+                    if complaint.assignment is not None
+                    else None
+                ),
+                created_at=complaint.created_at,
+            )
+            for complaint in complaints
+        ]
+
+    # * a client that just wrote reads past the cache, see database.wrote_recently
+    if database.wrote_recently(request):
+        data = load()
     else:
-        complaints: list = (
+        data = cache.complaint_lists.get_or_load(cache.staff_scope_key(staff), load)
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=data,
+    )
+
+
+@router.get("/export")
+def export_complaints(
+    request: Request,
+    export_format: Literal["csv", "jsonl", "parquet"] = Query("csv", alias="format"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    hall_name: str | None = None,
+    department: str | None = None,
+    complaint_status: str | None = Query(None, alias="status"),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+):
+    # * admins export everything, other staff only what get_all_complaints shows them
+    if not oauth2.is_admin(staff):
+        if staff.department == "Hall":
+            requested, allowed = hall_name, staff.hall_name
+            hall_name = allowed
+        else:
+            requested, allowed = department, staff.department
+            department = allowed
+        if allowed is None or requested not in (None, allowed):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only export complaints from your hall or department",
+            )
+
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                detail="Parquet export needs pyarrow installed",
+            )
+
+    writer, media_type = EXPORT_FORMATS[export_format]
+
+    def stream():
+        # * dependencies are torn down before the body is sent, so the export
+        # * holds its own session for as long as the response streams
+        db = database.open_read_session(request)
+        try:
+            yield from writer(
+                export.export_rows(
+                    db, start, end, hall_name, department, complaint_status
+                )
+            )
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="complaints.{export_format}"'
+        },
+    )
+
+
+@router.get(
+    "/students",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseModel[list[schemas.Complaints]],
+)
+def get_current_student_complaints(
+    request: Request,
+    search: str | None = None,
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
+    db: Session = Depends(database.get_read_db),
+):
+    def load(search: str | None = None):
+        query = (
             db.query(models.Complaint)
             .options(
                 joinedload(models.Complaint.category),
@@ -589,47 +841,55 @@ def get_current_student_complaints(
                 models.Priorities, models.Complaint.priority_id == models.Priorities.id
             )
             .filter(models.Complaint.student_id == student.id)
-            .filter(models.Complaint.title.ilike(f"%{search}%"))
             .order_by(models.Complaint.created_at.desc())
-            .all()
         )
+        if search:
+            query = query.filter(models.Complaint.title.ilike(f"%{search}%"))
+        complaints: list = query.all()
+
+        return [
+            schemas.Complaints(
+                id=complaint.id,
+                student_id=complaint.student_id,
+                category=schemas.ComplaintCategory(
+                    id=complaint.category.id,
+                    name=complaint.category.name,
+                ),
+                priority_id=complaint.priority_id,
+                title=complaint.title,
+                description=complaint.description,
+                file_url=complaint.file_url,
+                status=complaint.status,
+                complaint_assignment=(
+                    None
+                    if not complaint.assignment
+                    else schemas.ComplaintAssignment(
+                        id=complaint.assignment.id,
+                        staff=(
+                            schemas.Staff.model_validate(complaint.assignment.staff)
+                            if complaint.assignment and complaint.assignment.staff
+                            else None
+                        ),
+                        complaint_id=complaint.assignment.complaint_id,
+                        status=complaint.assignment.status,
+                        response=complaint.assignment.response,
+                        internal_notes=complaint.assignment.internal_notes,
+                        assigned_at=complaint.assignment.assigned_at,
+                        updated_at=complaint.assignment.updated_at,
+                        resolved_at=complaint.assignment.resolved_at,
+                    )
+                ),
+                created_at=complaint.created_at,
+            )
+            for complaint in complaints
+        ]
 
-    data = [
-        schemas.Complaints(
-            id=complaint.id,
-            student_id=complaint.student_id,
-            category=schemas.ComplaintCategory(
-                id=complaint.category.id,
-                name=complaint.category.name,
-            ),
-            priority_id=complaint.priority_id,
-            title=complaint.title,
-            description=complaint.description,
-            file_url=complaint.file_url,
-            status=complaint.status,
-            complaint_assignment=(
-                None
-                if not complaint.assignment
-                else schemas.ComplaintAssignment(
-                    id=complaint.assignment.id,
-                    staff=(
-                        schemas.Staff.model_validate(complaint.assignment.staff)
-                        if complaint.assignment and complaint.assignment.staff
-                        else None
-                    ),
-                    complaint_id=complaint.assignment.complaint_id,
-                    status=complaint.assignment.status,
-                    response=complaint.assignment.response,
-                    internal_notes=complaint.assignment.internal_notes,
-                    assigned_at=complaint.assignment.assigned_at,
-                    updated_at=complaint.assignment.updated_at,
-                    resolved_at=complaint.assignment.resolved_at,
-                )
-            ),
-            created_at=complaint.created_at,
-        )
-        for complaint in complaints
-    ]
+    # * only the unfiltered list is cached, searches and clients that just
+    # * wrote go to the database
+    if search or database.wrote_recently(request):
+        data = load(search)
+    else:
+        data = cache.complaint_lists.get_or_load(cache.student_key(student.id), load)
 
     return ResponseModel(
         metadata=schemas.Metadata(status_code=200, success=True),
@@ -644,7 +904,7 @@ def get_current_student_complaints(
 )
 def get_students_complaint_by_id(
     id: int,
-    student: schemas.Student = Depends(oauth2.get_current_student),
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
     db: Session = Depends(database.get_db),
 ):
     complaint = (
@@ -694,113 +954,210 @@ def get_students_complaint_by_id(
 
 
 # * When the complaint has been resolved the status should be changed to "resolved"
-@router.post("/", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(RateLimit("submit-complaint", per_minute=6, capacity=10))],
+)
 def submit_complaint(
     title: Annotated[str, Form(...)],
     description: Annotated[str, Form(...)],
     category_id: Annotated[int, Form(...)],
     priority_id: Annotated[int, Form(...)],
     file: UploadFile | None = None,
-    student: schemas.Student = Depends(oauth2.get_current_student),
+    file_key: Annotated[str | None, Form()] = None,
+    file_receipt: Annotated[str | None, Form()] = None,
+    idempotency_key: Annotated[str | None, Header()] = None,
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
     db: Session = Depends(database.get_db),
 ):
-    category = utils.categorize_complaint(title, description, category_id)
-    print(category)
+    # * attachments uploaded directly to storage through /uploads/presign
+    file_url = None
+    if file_key:
+        if not file_key.startswith(attachment_prefix(student.id)) or (
+            ".." in file_key.split("/")
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid file key",
+            )
+        try:
+            receipt = json.loads(file_receipt) if file_receipt else None
+        except ValueError:
+            receipt = None
+        file_url = storage.backend.uploaded_url(
+            file_key, receipt if isinstance(receipt, dict) else None
+        )
+        if not file_url:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File has not been uploaded",
+            )
 
-    data = create_complaint(
-        title, description, category.get("category_id"), priority_id, student, db, file
-    )
+    with idempotency.idempotent(
+        db,
+        idempotency_key,
+        f"submit-complaint:{student.id}",
+        title,
+        description,
+        category_id,
+        priority_id,
+        file.filename if file else None,
+        file.size if file else None,
+        file_key,
+    ) as request:
+        if request.replayed:
+            return request.response
+
+        category = utils.categorize_complaint(title, description, category_id)
+
+        data = create_complaint(
+            title,
+            description,
+            category.get("category_id"),
+            priority_id,
+            student,
+            db,
+            file,
+            file_url,
+        )
+        # * the background result re-routes the complaint if it disagrees
+        if category.get("pending"):
+            categorization.service.submit(data["complaint"].id, title, description)
 
-    return ResponseModel(
-        metadata=schemas.Metadata(status_code=201, success=True),
-        data=data,
-    )
+        request.response = ResponseModel(
+            metadata=schemas.Metadata(status_code=201, success=True),
+            data=data,
+        )
+        return request.response
 
 
 @router.post("/course-upload", status_code=status.HTTP_201_CREATED)
-async def submit_course_upload(
+def submit_course_upload(
     upload_details: schemas.CreateCourseUpload,
-    student: schemas.Student = Depends(oauth2.get_current_student),
+    idempotency_key: Annotated[str | None, Header()] = None,
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
     db: Session = Depends(database.get_db),
 ):
-    try:
-        # Start transaction
-        db.begin_nested()
+    with idempotency.idempotent(
+        db,
+        idempotency_key,
+        f"course-upload:{student.id}",
+        upload_details.model_dump_json(),
+    ) as request:
+        if request.replayed:
+            return request.response
 
-        # Check if course already exists
-        existing_course = (
-            db.query(models.Course)
-            .filter(models.Course.code == upload_details.course_code)
-            .first()
-        )
+        try:
+            # Start transaction
+            db.begin_nested()
+
+            # Check if course already exists
+            existing_course = (
+                db.query(models.Course)
+                .filter(models.Course.code == upload_details.course_code)
+                .first()
+            )
+
+            if not existing_course:
+                course = models.Course(
+                    title=upload_details.course_title, code=upload_details.course_code
+                )
+                db.add(course)
+                db.flush()
+            else:
+                course = existing_course
 
-        if not existing_course:
-            course = models.Course(
-                title=upload_details.course_title, code=upload_details.course_code
+            upload = models.CourseUploadIssue(
+                level=upload_details.level,
+                student_id=student.id,
+                course_id=course.id,
+                reason=upload_details.reason,
+                total_units=upload_details.total_units_for_the_semester,
             )
-            db.add(course)
+
+            db.add(upload)
             db.flush()
-        else:
-            course = existing_course
 
-        upload = models.CourseUploadIssue(
-            level=upload_details.level,
-            student_id=student.id,
-            course_id=course.id,
-            reason=upload_details.reason,
-            total_units=upload_details.total_units_for_the_semester,
-        )
+            # Create associated complaint with specific course upload details
+            complaint_title = f"Course Upload Issue: {upload_details.course_code}"
+            complaint_description = (
+                f"Course: {upload_details.course_title}\n"
+                f"Level: {upload_details.level}\n"
+                f"Reason: {upload_details.reason}"
+            )
 
-        db.add(upload)
-        db.flush()
+            complaint = create_complaint(
+                title=complaint_title,
+                description=complaint_description,
+                category_id=2,  # Course category
+                priority_id=2,  # Medium priority
+                student=student,
+                db=db,
+            )
 
-        # Create associated complaint with specific course upload details
-        complaint_title = f"Course Upload Issue: {upload_details.course_code}"
-        complaint_description = (
-            f"Course: {upload_details.course_title}\n"
-            f"Level: {upload_details.level}\n"
-            f"Reason: {upload_details.reason}"
-        )
+            db.commit()
+            data = schemas.CourseUpload.model_validate(upload, from_attributes=True)
 
-        complaint = create_complaint(
-            title=complaint_title,
-            description=complaint_description,
-            category_id=2,  # Course category
-            priority_id=2,  # Medium priority
-            student=student,
-            db=db,
-        )
+            request.response = ResponseModel(
+                metadata=schemas.Metadata(
+                    status_code=status.HTTP_201_CREATED, success=True
+                ),
+                data={"course_upload": data, "complaint": complaint["complaint"]},
+            )
+            return request.response
 
-        db.commit()
-        data = schemas.CourseUpload.model_validate(upload, from_attributes=True)
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error creating course upload: {str(e)}",
+            )
 
-        return ResponseModel(
-            metadata=schemas.Metadata(
-                status_code=status.HTTP_201_CREATED, success=True
-            ),
-            data={"course_upload": data, "complaint": complaint["complaint"]},
-        )
 
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error creating course upload: {str(e)}",
+@router.get(
+    "/{complaint_id}/timeline",
+    response_model=ResponseModel[list[schemas.ComplaintEvent]],
+)
+def get_complaint_timeline(
+    complaint_id: str,
+    user: schemas.UserPrincipal = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_read_db),
+):
+    if user.user_type == oauth2.STUDENT:
+        owned = (
+            db.query(models.Complaint.id)
+            .filter(models.Complaint.id == complaint_id)
+            .filter(models.Complaint.student_id == user.id)
+            .first()
         )
+        if not owned:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Complaint with id {complaint_id} doesn't exist",
+            )
+
+    timeline = (
+        db.query(models.ComplaintEvent)
+        .filter(models.ComplaintEvent.complaint_id == complaint_id)
+        .order_by(models.ComplaintEvent.id)
+        .all()
+    )
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=[schemas.ComplaintEvent.from_event(event) for event in timeline],
+    )
 
 
 @router.post("/escalate")
 def staff_escalate_complaint(
-    complaint_id: int,
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
+    complaint_id: str,
+    levels: int = Query(1, ge=1),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
     db: Session = Depends(database.get_db),
 ):
-    complaint_assignment = (
-        db.query(models.ComplaintAssignment)
-        .filter(models.ComplaintAssignment.complaint_id == complaint_id)
-        .first()
-    )
-    escalate_complaint(db, staff.role.department, complaint_id)
+    escalate_complaint(db, complaint_id, staff, levels)
 
     return ResponseModel(
         metadata=schemas.Metadata(status_code=200, success=True),
@@ -812,7 +1169,7 @@ def staff_escalate_complaint(
 def staff_complaint_response(
     complaint_id: str,
     complaint_response: schemas.ComplaintResponse,
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
     db: Session = Depends(database.get_db),
 ):
     try:
@@ -822,11 +1179,78 @@ def staff_complaint_response(
             ).update({"response": complaint_response.response})
             close_complaint(complaint_id, staff, db)
         else:
-            respond_to_complaint(complaint_id, complaint_response, db)
+            respond_to_complaint(complaint_id, complaint_response, db, staff)
     except Exception as err:
         raise HTTPException(status_code=500, detail=f"Internal server error {err}")
 
 
+@router.post(
+    "/rate/{complaint_id}",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseModel[schemas.Rating],
+)
+def rate_complaint(
+    complaint_id: str,
+    body: schemas.RatingCreate,
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
+    db: Session = Depends(database.get_db),
+):
+    # * the row lock stops a complaint being rated twice by concurrent requests
+    complaint = (
+        db.query(models.Complaint)
+        .filter(models.Complaint.id == complaint_id)
+        .filter(models.Complaint.student_id == student.id)
+        .with_for_update()
+        .first()
+    )
+    if not complaint:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Complaint with id {complaint_id} doesn't exist",
+        )
+    if complaint.status != "resolved":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only resolved complaints can be rated",
+        )
+    if complaint.is_rated:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Complaint has already been rated",
+        )
+
+    assignment = (
+        db.query(models.ComplaintAssignment)
+        .filter(models.ComplaintAssignment.complaint_id == complaint_id)
+        .first()
+    )
+
+    rating = models.Rating(
+        complaint_id=complaint_id, rating=body.rating, feedback=body.feedback
+    )
+    db.add(rating)
+    complaint.is_rated = True
+    if assignment:
+        ratings.record_rating(db, assignment.staff_id, body.rating)
+    events.record(
+        db,
+        complaint_id,
+        events.EventType.RATED,
+        events.ActorType.STUDENT,
+        student.id,
+        staff_id=assignment.staff_id if assignment else None,
+        value=body.rating,
+        detail=body.feedback,
+    )
+    db.commit()
+    db.refresh(rating)
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=201, success=True),
+        data=schemas.Rating.model_validate(rating),
+    )
+
+
 @router.patch("/student-follow-up/{id}")
 def complaint_follow_up(id: str, response: str, db: Session = Depends(database.get_db)):
     print(id)
@@ -836,7 +1260,15 @@ def complaint_follow_up(id: str, response: str, db: Session = Depends(database.g
         db.query(models.ComplaintAssignment).filter(
             models.ComplaintAssignment.complaint_id == id
         ).update({"internal_notes": response})
+        events.record(
+            db,
+            id,
+            events.EventType.FOLLOW_UP,
+            events.ActorType.STUDENT,
+            detail=response,
+        )
         db.commit()
+        cache.complaint_lists.invalidate(*cache.complaint_keys(db, id))
 
         return ResponseModel(
             metadata=schemas.Metadata(status_code=200, success=True),
@@ -849,8 +1281,8 @@ def complaint_follow_up(id: str, response: str, db: Session = Depends(database.g
 
 @router.get("/get-department-staff")
 def get_department_staff(
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
-    db: Session = Depends(database.get_db),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
 ):
     if staff.department == "Hall":
         staffs = (
@@ -890,7 +1322,7 @@ def get_department_staff(
 def reassign_complaint(
     complaint_id: str,
     staff_id: int = Query(...),
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
     db: Session = Depends(database.get_db),
 ):
     try:
@@ -906,11 +1338,32 @@ def reassign_complaint(
                 detail=f"Complaint with id {complaint_id} not found",
             )
 
+        assignment = (
+            db.query(models.ComplaintAssignment)
+            .filter(models.ComplaintAssignment.complaint_id == complaint_id)
+            .first()
+        )
+        if assignment and assignment.status != "resolved":
+            workload.add_open(db, assignment.staff_id, -1)
+            workload.add_open(db, staff_id, 1)
+
+        # * the previous staff member's list has to be invalidated as well
+        stale_keys = cache.complaint_keys(db, complaint_id)
+
         db.query(models.ComplaintAssignment).filter(
             models.ComplaintAssignment.complaint_id == complaint_id
-        ).update({"staff_id": staff_id})
+        ).update({"staff_id": staff_id, "leased_until": None})
+        events.record(
+            db,
+            complaint_id,
+            events.EventType.REASSIGNED,
+            events.ActorType.STAFF,
+            staff.id,
+            staff_id=staff_id,
+        )
 
         db.commit()
+        cache.complaint_lists.invalidate(*stale_keys, cache.staff_key(staff_id))
 
         complaint = (
             db.query(models.Complaint)
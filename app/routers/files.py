@@ -0,0 +1,52 @@
+import tempfile
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from .. import storage
+from ..config import settings
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+
+@router.get("/{key:path}")
+def get_file(key: str):
+    """Serves files kept by the local storage backend."""
+    if not isinstance(storage.backend, storage.LocalBackend):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    try:
+        return storage.backend.response(key)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="File not found"
+        )
+
+
+@router.put("/{key:path}", status_code=status.HTTP_201_CREATED)
+async def put_file(key: str, expires: int, signature: str, request: Request):
+    """Receives direct uploads presigned by the local storage backend."""
+    backend = storage.backend
+    content_type = request.headers.get("content-type", "")
+    if not isinstance(backend, storage.LocalBackend) or not backend.verify_upload(
+        key, content_type, expires, signature
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid upload signature"
+        )
+
+    max_bytes = settings.local_storage_max_upload_bytes
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Uploads are limited to {max_bytes} bytes",
+    )
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as body:
+        # * the header can be left out or wrong, so the body is counted too
+        async for chunk in request.stream():
+            if body.tell() + len(chunk) > max_bytes:
+                raise too_large
+            body.write(chunk)
+        body.seek(0)
+        await run_in_threadpool(backend.put, key, body, content_type)
+    return {"key": key}
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+from .. import database, models, notifications, oauth2, schemas
+from ..schemas import ResponseModel
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+
+@router.get("/", response_model=ResponseModel[schemas.NotificationPage])
+def get_notifications(
+    cursor: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: schemas.UserPrincipal = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_read_db),
+):
+    query = (
+        db.query(models.Notification)
+        .filter(models.Notification.user_type == user.user_type)
+        .filter(models.Notification.user_id == user.id)
+    )
+    # * keyset pagination, the cursor is the last id of the previous page
+    if cursor:
+        query = query.filter(models.Notification.id < cursor)
+    rows = query.order_by(models.Notification.id.desc()).limit(limit).all()
+
+    data = schemas.NotificationPage(
+        notifications=[schemas.Notification.model_validate(row) for row in rows],
+        next_cursor=rows[-1].id if len(rows) == limit else None,
+    )
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=data,
+    )
+
+
+@router.get("/unread-count")
+def get_unread_count(
+    user: schemas.UserPrincipal = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data={"unread": notifications.unread_count(db, user.user_type, user.id)},
+    )
+
+
+@router.patch("/mark-read", status_code=status.HTTP_200_OK)
+def mark_notifications_read(
+    body: schemas.MarkNotificationsRead,
+    user: schemas.UserPrincipal = Depends(oauth2.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    marked = notifications.mark_read(db, user.user_type, user.id, body.ids)
+    db.commit()
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data={
+            "marked": marked,
+            "unread": notifications.unread_count(db, user.user_type, user.id),
+        },
+    )
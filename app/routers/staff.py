@@ -1,16 +1,34 @@
-import cloudinary.uploader
+import csv
+import itertools
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Request,
     status,
     BackgroundTasks,
     UploadFile,
 )
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
-from .. import database, schemas, models, utils, oauth2
+from .. import (
+    cache,
+    database,
+    escalation,
+    events,
+    schemas,
+    models,
+    utils,
+    oauth2,
+    novu,
+    onboarding,
+    ratings,
+    storage,
+    work_queue,
+)
+from ..config import settings
 from ..schemas import ResponseModel
+from .complaints import close_complaint
 
 router = APIRouter(prefix="/staff", tags=["staff"])
 
@@ -44,9 +62,11 @@ def create_staff(staff: schemas.CreateStaff, db: Session = Depends(database.get_
             hall_name=staff.hall,
             password=staff.password,
             role_id=staff.role,
+            workload=models.StaffWorkload(open_complaints=0),
         )
         db.add(staff)
         db.commit()
+        escalation.tree.invalidate()
         db.refresh(staff)
 
         # * Send Welcome Email
@@ -68,13 +88,94 @@ def create_staff(staff: schemas.CreateStaff, db: Session = Depends(database.get_
         )
 
 
+def _onboard(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    rows: list,
+    conflicts: list[schemas.ImportConflict],
+):
+    if len(rows) + len(conflicts) > settings.bulk_import_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Imports are limited to {settings.bulk_import_max_rows} rows",
+        )
+
+    created, skipped = onboarding.import_staff(db, rows)
+
+    # * one batched send after the response instead of a request per person
+    background_tasks.add_task(
+        novu.send_bulk_email,
+        [
+            (
+                staff.email,
+                "Welcome to BU Voice 🎉",
+                f"Hello {staff.fullname},\n\nYour BU Voice staff account is ready.",
+            )
+            for staff in created
+        ],
+    )
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=201, success=True),
+        data=schemas.BulkImportResult(
+            created=len(created),
+            conflicts=sorted(conflicts + skipped, key=lambda conflict: conflict.row),
+        ),
+    )
+
+
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseModel[schemas.BulkImportResult],
+)
+def bulk_create_staff(
+    staff_list: list[dict],
+    background_tasks: BackgroundTasks,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_admin),
+    db: Session = Depends(database.get_db),
+):
+    rows, conflicts = onboarding.parse_rows(staff_list, schemas.CreateStaff)
+    return _onboard(db, background_tasks, rows, conflicts)
+
+
+@router.post(
+    "/bulk/csv",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseModel[schemas.BulkImportResult],
+)
+def bulk_create_staff_from_csv(
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_admin),
+    db: Session = Depends(database.get_db),
+):
+    """Columns: email, fullname, department, hall, role, password."""
+    try:
+        rows, conflicts = onboarding.parse_rows(
+            # * stop reading once the file is over the limit
+            itertools.islice(
+                onboarding.read_csv(file.file), settings.bulk_import_max_rows + 1
+            ),
+            schemas.CreateStaff,
+        )
+    except (UnicodeDecodeError, csv.Error) as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid CSV file: {str(err)}",
+        )
+    finally:
+        file.file.close()
+    return _onboard(db, background_tasks, rows, conflicts)
+
+
 @router.patch(
     "/update-profile-picture",
     status_code=status.HTTP_200_OK,
 )
 def update_profile_picture(
     profile_picture: UploadFile | None,
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
     db: Session = Depends(database.get_db),
 ):
     if not profile_picture.content_type.startswith("image/"):
@@ -84,21 +185,19 @@ def update_profile_picture(
         )
 
     try:
-        upload_result = cloudinary.uploader.upload(
+        profile_image = storage.backend.put(
+            f"profile_pictures/staff-{staff.id}",
             profile_picture.file,
-            folder="profile_pictures",
-            public_id=f"staff-{staff.id}",
-            overwrite=True,
-            resource_type="image",
+            profile_picture.content_type,
         )
 
         db.query(models.Staff).filter(models.Staff.id == staff.id).update(
-            {"profile_image": upload_result["secure_url"]}
+            {"profile_image": profile_image}
         )
         db.commit()
         data = {
             "message": "Profile picture updated successfully",
-            "profile_picture_url": upload_result["secure_url"],
+            "profile_picture_url": profile_image,
         }
         return ResponseModel(
             metadata=schemas.Metadata(status_code=200, success=True),
@@ -116,74 +215,84 @@ def update_profile_picture(
 
 @router.get("/complaints")
 def get_all_staff_assigned_complaints(
+    request: Request,
     search: str | None = None,
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
-    db: Session = Depends(database.get_db),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
 ):
-
-    base_query = (
-        db.query(models.Complaint)
-        .options(
-            joinedload(models.Complaint.category),
-            joinedload(models.Complaint.assignment),
-        )
-        .join(
-            models.ComplaintCategory,
-            models.Complaint.category_id == models.ComplaintCategory.id,
-            isouter=True,
-        )
-        .join(
-            models.ComplaintType,
-            models.Complaint.category_id == models.ComplaintType.category_id,
-            isouter=True,
-        )
-        .join(
-            models.ComplaintAssignment,
-            models.Complaint.id == models.ComplaintAssignment.complaint_id,
-            isouter=True,
+    def load(search: str | None = None):
+        base_query = (
+            db.query(models.Complaint)
+            .options(
+                joinedload(models.Complaint.category),
+                joinedload(models.Complaint.assignment),
+            )
+            .join(
+                models.ComplaintCategory,
+                models.Complaint.category_id == models.ComplaintCategory.id,
+                isouter=True,
+            )
+            .join(
+                models.ComplaintType,
+                models.Complaint.category_id == models.ComplaintType.category_id,
+                isouter=True,
+            )
+            .join(
+                models.ComplaintAssignment,
+                models.Complaint.id == models.ComplaintAssignment.complaint_id,
+                isouter=True,
+            )
+            .join(
+                models.Priorities, models.Complaint.priority_id == models.Priorities.id
+            )
+            .filter(models.ComplaintAssignment.staff_id == staff.id)
+            .order_by(models.Complaint.created_at.desc())
         )
-        .join(models.Priorities, models.Complaint.priority_id == models.Priorities.id)
-        .filter(models.ComplaintAssignment.staff_id == staff.id)
-        .order_by(models.Complaint.created_at.desc())
-    )
 
-    if search:
-        base_query = base_query.filter(models.Complaint.title.ilike(f"%{search}%"))
+        if search:
+            base_query = base_query.filter(models.Complaint.title.ilike(f"%{search}%"))
 
-    complaints: list = base_query.all()
+        complaints: list = base_query.all()
 
-    data = [
-        schemas.Complaints(
-            id=complaint.id,
-            student_id=complaint.student_id,
-            category=schemas.ComplaintCategory(
-                id=complaint.category.id,
-                name=complaint.category.name,
-            ),
-            priority_id=complaint.priority_id,
-            title=complaint.title,
-            description=complaint.description,
-            file_url=complaint.file_url,
-            status=complaint.status,
-            complaint_assignment=(
-                schemas.ComplaintAssignment(
-                    id=complaint.assignment.id,
-                    staff=complaint.assignment.staff,
-                    complaint_id=complaint.assignment.complaint_id,
-                    status=complaint.assignment.status,
-                    response=complaint.assignment.response,
-                    internal_notes=complaint.assignment.internal_notes,
-                    assigned_at=complaint.assignment.assigned_at,
-                    updated_at=complaint.assignment.updated_at,
-                    resolved_at=complaint.assignment.resolved_at,
-                )
-                if complaint.assignment is not None
-                else None
-            ),
-            created_at=complaint.created_at,
-        )
-        for complaint in complaints
-    ]
+        return [
+            schemas.Complaints(
+                id=complaint.id,
+                student_id=complaint.student_id,
+                category=schemas.ComplaintCategory(
+                    id=complaint.category.id,
+                    name=complaint.category.name,
+                ),
+                priority_id=complaint.priority_id,
+                title=complaint.title,
+                description=complaint.description,
+                file_url=complaint.file_url,
+                status=complaint.status,
+                complaint_assignment=(
+                    schemas.ComplaintAssignment(
+                        id=complaint.assignment.id,
+                        staff=complaint.assignment.staff,
+                        complaint_id=complaint.assignment.complaint_id,
+                        status=complaint.assignment.status,
+                        response=complaint.assignment.response,
+                        internal_notes=complaint.assignment.internal_notes,
+                        assigned_at=complaint.assignment.assigned_at,
+                        updated_at=complaint.assignment.updated_at,
+                        resolved_at=complaint.assignment.resolved_at,
+                    )
+                    if complaint.assignment is not None
+                    else None
+                ),
+                created_at=complaint.created_at,
+            )
+            for complaint in complaints
+        ]
+
+    # * only the unfiltered list is cached, searches and clients that just
+    # * wrote go to the database
+    if search or database.wrote_recently(request):
+        data = load(search)
+    else:
+        data = cache.complaint_lists.get_or_load(cache.staff_key(staff.id), load)
 
     return ResponseModel(
         metadata=schemas.Metadata(status_code=200, success=True),
@@ -193,8 +302,8 @@ def get_all_staff_assigned_complaints(
 
 @router.get("/resolved-complaints")
 def get_all_staff_resolved_complaints(
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
-    db: Session = Depends(database.get_db),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
 ):
     complaints: list = (
         db.query(models.Complaint)
@@ -260,10 +369,119 @@ def get_all_staff_resolved_complaints(
     )
 
 
+@router.get("/score/{staff_id}", response_model=ResponseModel[schemas.StaffScore])
+def get_staff_score(
+    staff_id: int,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
+):
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=schemas.StaffScore.model_validate(ratings.staff_score(db, staff_id)),
+    )
+
+
+@router.get(
+    "/resolution-stats", response_model=ResponseModel[list[schemas.ResolutionStats]]
+)
+def get_resolution_stats(
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_read_db),
+):
+    # * read from the projection kept up to date by the RESOLVED events
+    rows = db.query(models.StaffResolutionStats).all()
+    data = [
+        schemas.ResolutionStats(
+            staff_id=row.staff_id,
+            resolved_count=row.resolved_count,
+            average_resolution_hours=(
+                row.total_resolution_seconds / row.resolved_count / 3600
+                if row.resolved_count
+                else 0.0
+            ),
+        )
+        for row in rows
+    ]
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=data,
+    )
+
+
+@router.get("/queue/next", response_model=ResponseModel[schemas.QueueItem | None])
+def get_next_queue_item(
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_db),
+):
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=work_queue.peek(db, staff.id),
+    )
+
+
+@router.post("/queue/claim", response_model=ResponseModel[schemas.QueueItem | None])
+def claim_next_queue_item(
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_db),
+):
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=work_queue.claim(db, staff.id),
+    )
+
+
+@router.post("/queue/{complaint_id}/lease")
+def renew_queue_lease(
+    complaint_id: str,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_db),
+):
+    leased_until = work_queue.renew(db, staff.id, complaint_id)
+
+    if not leased_until:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Complaint with id {complaint_id} isn't open in your queue",
+        )
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data={"complaint_id": complaint_id, "leased_until": leased_until},
+    )
+
+
+@router.post("/queue/{complaint_id}/release")
+def release_queue_item(
+    complaint_id: str,
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+    db: Session = Depends(database.get_db),
+):
+    if not work_queue.release(db, staff.id, complaint_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Complaint with id {complaint_id} isn't open in your queue",
+        )
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data={"complaint_id": complaint_id, "leased_until": None},
+    )
+
+
+@router.get("/cache-stats")
+def get_cache_stats(
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
+):
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=cache.complaint_lists.stats(),
+    )
+
+
 @router.patch("/update-complaint")
 def update_complaint(
     update_complaint: schemas.ComplaintUpdate,
-    staff: schemas.Staff = Depends(oauth2.get_current_staff),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_staff),
     db: Session = Depends(database.get_db),
 ):
     complaint = (
@@ -278,10 +496,25 @@ def update_complaint(
             detail=f"Complaint with id {update_complaint.id} doesn't exist",
         )
 
+    # * resolving also frees the workload and resolves linked duplicates
+    if update_complaint.status == "resolved":
+        db.query(models.ComplaintAssignment).filter(
+            models.ComplaintAssignment.complaint_id == update_complaint.id
+        ).update({"response": update_complaint.response})
+        return close_complaint(update_complaint.id, staff, db).data
+
     complaint.status = update_complaint.status
     complaint.assignment.response = update_complaint.response
     db.add(complaint)
+    events.record_response(
+        db,
+        complaint.id,
+        staff.id,
+        update_complaint.status,
+        update_complaint.response,
+    )
     db.commit()
+    cache.complaint_lists.invalidate(*cache.complaint_keys(db, complaint.id))
     db.refresh(complaint)
 
     complaint = schemas.Complaints(
@@ -1,4 +1,4 @@
-import cloudinary.uploader
+import csv
 from fastapi import (
     APIRouter,
     BackgroundTasks,
@@ -8,10 +8,12 @@ from fastapi import (
     File,
     UploadFile,
 )
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.novu import send_email
-from .. import schemas, utils, models, database, oauth2
+from .. import schemas, utils, models, database, oauth2, onboarding, storage
 from ..schemas import ResponseModel
 
 router = APIRouter(prefix="/student", tags=["students"])
@@ -30,15 +32,35 @@ async def create_student(
     hashed_password = utils.get_password_hash(student.password)
     student.password = hashed_password
     existing_student = (
-        db.query(models.Student).filter(models.Student.email == student.email).first()
+        db.query(models.Student)
+        .filter(
+            or_(
+                models.Student.email == student.email,
+                models.Student.matric_no == student.matric_no,
+            )
+        )
+        .first()
     )
     if existing_student:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT, detail="Email already registered"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                "Email already registered"
+                if existing_student.email == student.email
+                else "Matric number already registered"
+            ),
         )
     student = models.Student(**student.model_dump())
     db.add(student)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # * lost a race with a concurrent registration
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email or matric number already registered",
+        )
     db.refresh(student)
 
     # Send email in the background
@@ -53,10 +75,39 @@ async def create_student(
     )
 
 
+@router.post(
+    "/roster",
+    response_model=ResponseModel[schemas.BulkImportResult],
+)
+def import_student_roster(
+    file: UploadFile = File(...),
+    staff: schemas.StaffPrincipal = Depends(oauth2.get_current_admin),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Columns: matric_no, email, fullname, department, school, hallname and
+    optionally password. Existing students are matched on matric_no.
+    """
+    try:
+        result = onboarding.import_students(db, onboarding.read_csv(file.file))
+    except (UnicodeDecodeError, csv.Error) as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid CSV file, rows before the error were imported: {str(err)}",
+        )
+    finally:
+        file.file.close()
+
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=200, success=True),
+        data=result,
+    )
+
+
 @router.patch("/update-profile-picture", status_code=status.HTTP_200_OK)
 def update_profile_picture(
     profile_picture: UploadFile = File(...),
-    student: schemas.Student = Depends(oauth2.get_current_student),
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
     db: Session = Depends(database.get_db),
 ):
     if not profile_picture.content_type.startswith("image/"):
@@ -66,26 +117,21 @@ def update_profile_picture(
         )
 
     try:
-        # Read the file as binary
-        file_bytes = profile_picture.file.read()
-
-        # Upload to Cloudinary using a binary stream
-        upload_result = utils.upload_file(
-            file=file_bytes,  # Pass binary data instead of file object
-            type="image",
-            public_id=f"student-{student.id}",
-            folder="profile_pictures",
+        profile_image = storage.backend.put(
+            f"profile_pictures/student-{student.id}",
+            profile_picture.file,
+            profile_picture.content_type,
         )
 
         # Update student profile picture in DB
         db.query(models.Student).filter(models.Student.id == student.id).update(
-            {"profile_image": upload_result["secure_url"]}
+            {"profile_image": profile_image}
         )
         db.commit()
 
         data = {
             "message": "Profile picture updated successfully",
-            "profile_picture_url": upload_result["secure_url"],
+            "profile_picture_url": profile_image,
         }
         return ResponseModel(
             metadata=schemas.Metadata(status_code=200, success=True),
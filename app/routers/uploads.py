@@ -0,0 +1,41 @@
+import os
+import uuid
+from fastapi import APIRouter, Depends, status
+from .. import oauth2, schemas, storage
+from ..schemas import ResponseModel
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+
+def attachment_prefix(student_id: int) -> str:
+    return f"complaints/{student_id}/"
+
+
+def attachment_key(student_id: int, filename: str) -> str:
+    """Unique per upload, so students can't overwrite each other's files."""
+    return f"{attachment_prefix(student_id)}{uuid.uuid4().hex}-{os.path.basename(filename)}"
+
+
+@router.post(
+    "/presign",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ResponseModel[schemas.PresignedUpload],
+)
+def presign_upload(
+    upload: schemas.PresignUpload,
+    student: schemas.StudentPrincipal = Depends(oauth2.get_current_student),
+):
+    """
+    Signs a direct upload of a complaint attachment. The client sends the file
+    to the returned URL and submits the complaint with the returned `key`.
+    With Cloudinary it also passes the upload response as `file_receipt`.
+    """
+    # * keys are scoped to the student so they can only attach their own uploads
+    key = attachment_key(student.id, upload.filename)
+    data = schemas.PresignedUpload(
+        key=key, **storage.backend.presigned_upload(key, upload.content_type)
+    )
+    return ResponseModel(
+        metadata=schemas.Metadata(status_code=201, success=True),
+        data=data,
+    )
@@ -0,0 +1,86 @@
+import logging
+from collections import defaultdict
+from typing import NamedTuple
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .config import settings
+from .snapshot import Snapshot
+
+ANY = "any"
+HALL = "hall"
+DEPARTMENT = "department"
+
+
+logger = logging.getLogger(__name__)
+
+
+class Route(NamedTuple):
+    role_id: int
+    scope: str  # any, hall, department
+
+
+# * the routing migration 0009 seeds, used while routing_rules is empty, e.g.
+# * when the roles didn't exist yet when it ran: hall complaints (1) to role 4,
+# * course complaints (2) to role 5, everything else to role 6
+DEFAULT_ROUTES: dict[int | None, tuple[Route, ...]] = {
+    1: (Route(4, HALL), Route(4, ANY)),
+    2: (Route(5, DEPARTMENT), Route(5, ANY)),
+    None: (Route(6, ANY),),
+}
+
+
+class RoutingTable(Snapshot):
+    """
+    In-memory copy of `routing_rules`, compiled into one ordered fallback
+    chain per category and reloaded at most every `refresh_seconds` or after
+    `invalidate`. Picking who may receive a complaint costs a dictionary
+    lookup instead of queries.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        super().__init__(refresh_seconds)
+        self._routes: dict[int | None, tuple[Route, ...]] = {}
+
+    def _load(self, db: Session):
+        routes = defaultdict(list)
+        for category_id, role_id, scope in db.query(
+            models.RoutingRule.category_id,
+            models.RoutingRule.role_id,
+            models.RoutingRule.scope,
+        ).order_by(models.RoutingRule.category_id, models.RoutingRule.position):
+            routes[category_id].append(Route(role_id, scope))
+        self._routes = {
+            category_id: tuple(chain) for category_id, chain in routes.items()
+        }
+        if not self._routes:
+            logger.warning("routing_rules is empty, using the default routes")
+            self._routes = DEFAULT_ROUTES
+
+    def routes(self, category_id: int | None) -> tuple[Route, ...]:
+        """The category's chain, or the default chain (category NULL)."""
+        return self._routes.get(category_id) or self._routes.get(None, ())
+
+    def candidates(
+        self, category_id: int | None, student: schemas.StudentPrincipal
+    ) -> list[list]:
+        """
+        Staff filters to try in order until one matches somebody. Scoped
+        routes the student can't satisfy, such as a hall route for a student
+        without a hall, are left out.
+        """
+        candidates = []
+        for route in self.routes(category_id):
+            criteria = [models.Staff.role_id == route.role_id]
+            if route.scope == HALL:
+                if not student.hallname:
+                    continue
+                criteria.append(models.Staff.hall_name == student.hallname)
+            elif route.scope == DEPARTMENT:
+                if not student.department:
+                    continue
+                criteria.append(models.Staff.department == student.department)
+            candidates.append(criteria)
+        return candidates
+
+
+table = RoutingTable(refresh_seconds=settings.routing_rules_refresh_seconds)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Generic, Optional, TypeVar
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 T = TypeVar("T")
 
@@ -10,6 +10,37 @@ class TokenData(BaseModel):
     email: str | None = None
 
 
+class StudentPrincipal(BaseModel):
+    id: int
+    email: str
+    department: str | None = None
+    hallname: str | None = None
+
+
+class UserPrincipal(BaseModel):
+    id: int
+    user_type: str
+
+
+class StaffPrincipal(BaseModel):
+    id: int
+    email: str
+    role_id: int
+    role: str | None = None
+    department: str
+    hall_name: str | None = None
+
+
+class RefreshToken(BaseModel):
+    refresh_token: str
+
+
+class TokenPair(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+
 class Student(BaseModel):
     id: int
     matric_no: str
@@ -36,6 +67,16 @@ class CreateStudent(BaseModel):
     hallname: str
 
 
+class RosterStudent(BaseModel):
+    matric_no: str
+    email: EmailStr | None = None
+    fullname: str | None = None
+    department: str
+    school: str
+    hallname: str | None = None
+    password: str | None = None
+
+
 class Role(BaseModel):
     id: int
     name: str
@@ -69,6 +110,18 @@ class CreateStaff(BaseModel):
     password: str
 
 
+class ImportConflict(BaseModel):
+    row: int  # 1-based, not counting a CSV header
+    email: str | None = None
+    reason: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    updated: int = 0
+    conflicts: list[ImportConflict] = []
+
+
 class Metadata(BaseModel):
     timestamp: datetime = datetime.now()
     status_code: int
@@ -77,12 +130,14 @@ class Metadata(BaseModel):
 
 class LoginResponse(BaseModel):
     access_token: str
+    refresh_token: str | None = None
     token_type: str
     student: Student
 
 
 class StaffLoginResponse(BaseModel):
     access_token: str
+    refresh_token: str | None = None
     token_type: str
     staff: Staff
 
@@ -135,6 +190,24 @@ class Complaints(BaseModel):
     file_url: str | None = None
     status: str
     complaint_assignment: ComplaintAssignment | None = None
+    parent_id: str | None = None
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True,
+    }
+
+
+class RatingCreate(BaseModel):
+    rating: int = Field(ge=1, le=5)
+    feedback: str | None = None
+
+
+class Rating(BaseModel):
+    id: int
+    complaint_id: str
+    rating: int
+    feedback: str | None = None
     created_at: datetime
 
     model_config = {
@@ -142,6 +215,74 @@ class Complaints(BaseModel):
     }
 
 
+class StaffScore(BaseModel):
+    staff_id: int
+    rating_count: int
+    mean: float
+    score: float
+
+    model_config = {
+        "from_attributes": True,
+    }
+
+
+class PresignUpload(BaseModel):
+    filename: str
+    content_type: str
+
+
+class PresignedUpload(BaseModel):
+    key: str
+    method: str
+    url: str
+    fields: dict
+    headers: dict
+
+
+class QueueItem(BaseModel):
+    complaint_id: str
+    title: str
+    description: str
+    status: str
+    priority_id: int
+    priority_level: str
+    created_at: datetime
+    sla_due_at: datetime | None = None
+    leased_until: datetime | None = None
+
+
+class ComplaintEvent(BaseModel):
+    id: int
+    event_type: str
+    actor_type: str
+    actor_id: int | None = None
+    staff_id: int | None = None
+    value: int | None = None
+    detail: str | None = None
+    created_at: datetime
+
+    @classmethod
+    def from_event(cls, event) -> "ComplaintEvent":
+        from .events import ActorType, EventType
+
+        return cls(
+            id=event.id,
+            event_type=EventType(event.event_type).name.lower(),
+            actor_type=ActorType(event.actor_type).name.lower(),
+            actor_id=event.actor_id,
+            staff_id=event.staff_id,
+            value=event.value,
+            detail=event.detail,
+            created_at=event.created_at,
+        )
+
+
+class ResolutionStats(BaseModel):
+    staff_id: int
+    resolved_count: int
+    average_resolution_hours: float
+
+
 class CreateCourseUpload(BaseModel):
     level: int
     academic_year: int
@@ -179,3 +320,24 @@ class CourseUpload(BaseModel):
 class ComplaintResponse(BaseModel):
     response: str
     status: str
+
+
+class Notification(BaseModel):
+    id: int
+    complaint_id: str
+    message: str
+    is_read: bool
+    created_at: datetime
+
+    model_config = {
+        "from_attributes": True,
+    }
+
+
+class NotificationPage(BaseModel):
+    notifications: list[Notification]
+    next_cursor: int | None = None
+
+
+class MarkNotificationsRead(BaseModel):
+    ids: list[int] | None = None  # * every unread notification when empty
@@ -0,0 +1,86 @@
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from .config import settings
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+def worker_count() -> int:
+    return settings.web_concurrency or multiprocessing.cpu_count() * 2 + 1
+
+
+def size_pools(workers: int):
+    """
+    Splits the connection budget between workers so that every pool at its
+    maximum stays under Postgres' max_connections. Replicas get the same
+    budget on their own servers.
+    """
+    budget = max(
+        1,
+        (settings.database_max_connections - settings.database_reserved_connections)
+        // workers,
+    )
+    settings.database_pool_size = max(1, budget // 2)
+    settings.database_max_overflow = budget - settings.database_pool_size
+
+
+def post_fork(server, worker):
+    # * connections opened in the master must not be shared with the workers
+    from .database import engine, replica_router
+
+    engine.dispose(close=False)
+    for replica in replica_router.replicas:
+        replica.dispose(close=False)
+
+
+class Server(BaseApplication):
+    """
+    Gunicorn master managing uvicorn workers. The app is imported once in
+    the master and forked, so workers share its code pages. SIGHUP restarts
+    the workers gracefully, SIGUSR2 then SIGTERM to the old master deploys
+    new code without dropping connections.
+    """
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from .main import app
+
+        return app
+
+
+def main():
+    workers = worker_count()
+    # * must run before the app, and with it the engines, is imported
+    size_pools(workers)
+    Server(
+        {
+            "bind": f"0.0.0.0:{settings.port}",
+            "workers": workers,
+            "worker_class": "app.server.Worker",
+            "preload_app": True,
+            "post_fork": post_fork,
+            "graceful_timeout": settings.graceful_timeout_seconds,
+            "timeout": settings.graceful_timeout_seconds * 2,
+            # * recycle workers now and then so slow leaks can't build up
+            "max_requests": settings.max_requests_per_worker,
+            "max_requests_jitter": settings.max_requests_per_worker // 10,
+            # * so request.client is the real client, not the proxy
+            "forwarded_allow_ips": settings.forwarded_allow_ips,
+            "accesslog": "-",
+        }
+    ).run()
+
+
+if __name__ == "__main__":
+    # * python -m app.server
+    main()
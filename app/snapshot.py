@@ -0,0 +1,40 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from sqlalchemy.orm import Session
+
+
+class Snapshot(ABC):
+    """
+    In-memory copy of database rows, reloaded by `refresh` at most every
+    `refresh_seconds` or after `invalidate`. Concurrent refreshes of a stale
+    copy run `_load` once; the others return once it is done.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.refresh_seconds
+        )
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def refresh(self, db: Session):
+        if self._fresh():
+            return
+        with self._lock:
+            if self._fresh():
+                return
+            self._load(db)
+            self._loaded_at = time.monotonic()
+
+    @abstractmethod
+    def _load(self, db: Session):
+        """Reads the rows and swaps in the new copy."""
+        raise NotImplementedError
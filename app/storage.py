@@ -0,0 +1,365 @@
+import hmac
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+from urllib.parse import urlencode
+from fastapi.responses import FileResponse, Response
+from .config import settings
+
+
+class StorageBackend(ABC):
+    """Stores uploaded files under keys such as `complaints/<filename>`."""
+
+    @abstractmethod
+    def put(
+        self, key: str, data: BinaryIO | bytes, content_type: str | None = None
+    ) -> str:
+        """Stores the file and returns the URL it is served from."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        """Time-limited read URL for the file."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def presigned_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> dict:
+        """
+        Lets a client upload straight to storage. Returns the `method` and
+        `url` to send the file to, plus any form `fields` or `headers` the
+        request must carry.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def uploaded_url(self, key: str, receipt: dict | None = None) -> str | None:
+        """
+        URL of a directly uploaded file, None if nothing was uploaded.
+        `receipt` is the upload response the client got from the provider,
+        for backends that prove the upload with it.
+        """
+        raise NotImplementedError
+
+
+class CloudinaryBackend(StorageBackend):
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str):
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self._configured = False
+
+    def _configure(self):
+        # * the SDK is imported and configured on first use, not at startup
+        if not self._configured:
+            import cloudinary
+
+            cloudinary.config(
+                cloud_name=self.cloud_name,
+                api_key=self.api_key,
+                api_secret=self.api_secret,
+                secure=True,
+            )
+            self._configured = True
+
+    def put(
+        self, key: str, data: BinaryIO | bytes, content_type: str | None = None
+    ) -> str:
+        self._configure()
+        import cloudinary.uploader
+
+        upload_result = cloudinary.uploader.upload(
+            data,
+            public_id=key,
+            overwrite=True,
+            resource_type="auto",
+        )
+        return upload_result["secure_url"]
+
+    def get(self, key: str) -> bytes:
+        import requests
+
+        response = requests.get(self.presigned_url(key), timeout=30)
+        response.raise_for_status()
+        return response.content
+
+    def presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        self._configure()
+        import cloudinary.utils
+
+        # * Cloudinary signatures don't expire, the URL is signed but permanent
+        url, _ = cloudinary.utils.cloudinary_url(key, sign_url=True, secure=True)
+        return url
+
+    def delete(self, key: str):
+        self._configure()
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(key, invalidate=True)
+
+    def presigned_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> dict:
+        self._configure()
+        import cloudinary.utils
+
+        # * Cloudinary rejects signed uploads with timestamps over an hour old
+        params = {"public_id": key, "timestamp": int(time.time())}
+        return {
+            "method": "POST",
+            "url": f"https://api.cloudinary.com/v1_1/{self.cloud_name}/auto/upload",
+            "fields": {
+                **params,
+                "api_key": self.api_key,
+                "signature": cloudinary.utils.api_sign_request(params, self.api_secret),
+            },
+            "headers": {},
+        }
+
+    def uploaded_url(self, key: str, receipt: dict | None = None) -> str | None:
+        # * the upload response is signed over public_id and version, checking
+        # * it locally avoids a rate limited Admin API call per submission
+        import cloudinary.utils
+
+        receipt = receipt or {}
+        version = receipt.get("version")
+        resource_type = receipt.get("resource_type", "image")
+        signature = receipt.get("signature")
+        if (
+            receipt.get("public_id") != key
+            or not isinstance(version, int)
+            or not isinstance(signature, str)
+            or resource_type not in ("image", "video", "raw")
+        ):
+            return None
+        expected = cloudinary.utils.api_sign_request(
+            {"public_id": key, "version": version}, self.api_secret
+        )
+        if not hmac.compare_digest(signature, expected):
+            return None
+
+        self._configure()
+        url, _ = cloudinary.utils.cloudinary_url(
+            key, version=version, resource_type=resource_type, secure=True
+        )
+        return url
+
+
+class LocalBackend(StorageBackend):
+    """
+    Keeps files on local disk. They're served publicly from the `/files`
+    route, the same way Cloudinary delivery URLs are public.
+    """
+
+    def __init__(
+        self, root: str, base_url: str, accel_redirect_prefix: str | None = None
+    ):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.accel_redirect_prefix = accel_redirect_prefix
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Invalid storage key {key}")
+        return path
+
+    def put(
+        self, key: str, data: BinaryIO | bytes, content_type: str | None = None
+    ) -> str:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # * write to a temporary file first so readers never see a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "wb") as output:
+                if isinstance(data, bytes):
+                    output.write(data)
+                else:
+                    while chunk := data.read(1024 * 1024):
+                        output.write(chunk)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return f"{self.base_url}/files/{key}"
+
+    def get(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as file:
+            return file.read()
+
+    def presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        return f"{self.base_url}/files/{key}"
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _signature(self, key: str, content_type: str, expires: int) -> str:
+        message = f"{key}:{content_type}:{expires}".encode()
+        return hmac.new(settings.secret_key.encode(), message, "sha256").hexdigest()
+
+    def presigned_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> dict:
+        expires = int(time.time()) + expires_in
+        query = urlencode(
+            {
+                "expires": expires,
+                "signature": self._signature(key, content_type, expires),
+            }
+        )
+        return {
+            "method": "PUT",
+            "url": f"{self.base_url}/files/{key}?{query}",
+            "fields": {},
+            "headers": {"Content-Type": content_type},
+        }
+
+    def verify_upload(
+        self, key: str, content_type: str, expires: int, signature: str
+    ) -> bool:
+        return expires >= time.time() and hmac.compare_digest(
+            signature, self._signature(key, content_type, expires)
+        )
+
+    def uploaded_url(self, key: str, receipt: dict | None = None) -> str | None:
+        if not os.path.isfile(self.path(key)):
+            return None
+        return f"{self.base_url}/files/{key}"
+
+    def response(self, key: str) -> Response:
+        path = self.path(key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(key)
+        if self.accel_redirect_prefix:
+            # * nginx serves the file itself with sendfile
+            return Response(
+                headers={"X-Accel-Redirect": f"{self.accel_redirect_prefix}{key}"}
+            )
+        return FileResponse(path)
+
+
+class S3Backend(StorageBackend):
+    """S3 or any S3-compatible store such as MinIO."""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: str | None,
+        access_key_id: str | None,
+        secret_access_key: str | None,
+        region: str,
+        public_url: str | None = None,
+    ):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self._client = None
+        self.public_url = (
+            public_url
+            or f"{endpoint_url or f'https://s3.{region}.amazonaws.com'}/{bucket}"
+        ).rstrip("/")
+
+    @property
+    def client(self):
+        # * boto3 takes a while to import, so it's only loaded on first use
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key,
+                region_name=self.region,
+            )
+        return self._client
+
+    def put(
+        self, key: str, data: BinaryIO | bytes, content_type: str | None = None
+    ) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        if isinstance(data, bytes):
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        else:
+            self.client.upload_fileobj(data, self.bucket, key, ExtraArgs=extra)
+        return f"{self.public_url}/{key}"
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def presigned_url(self, key: str, expires_in: int = 3600) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_upload(
+        self, key: str, content_type: str, expires_in: int = 900
+    ) -> dict:
+        return {
+            "method": "PUT",
+            "url": self.client.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+                ExpiresIn=expires_in,
+            ),
+            "fields": {},
+            "headers": {"Content-Type": content_type},
+        }
+
+    def uploaded_url(self, key: str, receipt: dict | None = None) -> str | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+        return f"{self.public_url}/{key}"
+
+
+def get_backend() -> StorageBackend:
+    if settings.storage_backend == "local":
+        return LocalBackend(
+            settings.local_storage_path,
+            settings.storage_public_url or "",
+            settings.local_storage_accel_redirect_prefix,
+        )
+    if settings.storage_backend == "s3":
+        return S3Backend(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+            region=settings.s3_region,
+            public_url=settings.storage_public_url,
+        )
+    return CloudinaryBackend(
+        settings.cloudinary_cloud_name,
+        settings.cloudinary_api_key,
+        settings.cloudinary_secret_key,
+    )
+
+
+backend = get_backend()
@@ -1,11 +1,8 @@
 from enum import Enum
-import google.generativeai as genai
 import logging
-import cloudinary.uploader
 import httpx
 from passlib.context import CryptContext
-from fastapi import UploadFile
-from . import models, config
+from . import categorization, classifier, config
 
 MAILGUN_DOMAIN = "sandbox35d2e69a8a264e7da82233d5568f1a2d.mailgun.org"
 
@@ -21,27 +18,6 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def upload_file(file, type: str, public_id: str, folder: str) -> dict:
-    upload_result = cloudinary.uploader.upload(
-        file,
-        folder=folder,
-        public_id=public_id,
-        overwrite=True,
-        resource_type=type,
-    )
-
-    return upload_result
-
-
-def get_staff_role_id_from_complaint(complaint: models.Complaint) -> int:
-    if complaint.category_id == 1:
-        return 4
-    elif complaint.category_id == 2:
-        return 5
-    else:
-        return 6
-
-
 # * Function to send Welcom Mail
 # async def send_staff_welcome_email(
 #     background_tasks: BackgroundTasks, email: str, name: str, role: str
@@ -100,44 +76,30 @@ async def send_email(to_email: str, subject: str, template: str, variables: dict
         logging.error(f"Unexpected error: {e}")
 
 
-def setup_gemini():
-    genai.configure(api_key=config.settings.gemini_api_key)
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    return model
-
-
 def categorize_complaint(title: str, description: str, category_id: int) -> dict:
-    # """
-    # Categorizes complaints using Gemini AI into hall, course, or bursary categories.
-    # Returns category_id and confidence score.
-    # """
-    # model = setup_gemini()
-
-    # prompt = f"""
-    # Analyze this complaint and categorize it into one of these categories:
-    # 1. Hall (issues related to student accommodation, facilities, or hall management)
-    # 2. Course (academic issues, registration, course materials, or lectures)
-    # 3. Bursary (financial matters, fees, or payments)
-
-    # Complaint Title: {title}
-    # Complaint Description: {description}
-
-    # Respond in this JSON format only:
-    # {{
-    #     "category_id": (1 for Hall, 2 for Course, 3 for Bursary),
-    #     "confidence": (confidence score between 0 and 1),
-    #     "reasoning": "brief explanation of the categorization"
-    # }}
-    # """
-
-    # try:
-    #     response = model.generate_content(prompt)
-    #     result = eval(response.text)  # Convert string response to dict
-    #     return result
-    # except Exception as e:
-    # Fallback to default category (Course) if AI categorization fails
+    """
+    Categorizes a complaint with the local classifier, falling back to the AI
+    categorization when the classifier isn't confident enough. The AI only
+    answers from its cache; on a miss the category the student picked is
+    used and the result is marked `pending`, so the caller can queue the
+    complaint for background categorization once it exists. Submission never
+    waits on the LLM.
+    """
+    if classifier.classifier:
+        result = classifier.classifier.predict(title, description)
+        if (
+            categorization.is_valid(result)
+            and result["confidence"] >= config.settings.classifier_confidence_threshold
+        ):
+            return result
+
+    result = categorization.service.lookup(title, description)
+    if categorization.is_valid(result):
+        return result
+
     return {
         "category_id": category_id,
         "confidence": 0.5,
-        "reasoning": "Fallback categorization due to AI processing error",
+        "reasoning": "Categorization pending, using the selected category",
+        "pending": True,
     }
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import literal_column, or_
+from sqlalchemy.orm import Session
+from . import models, schemas
+from .config import settings
+
+
+def sla_deadline():
+    """When the complaint is due, NULL if its priority has no SLA."""
+    return models.Complaint.created_at + models.Priorities.sla_hours * literal_column(
+        "interval '1 hour'"
+    )
+
+
+def _open_items(db: Session, staff_id: int):
+    """
+    The staff member's unresolved assignments, most urgent first: priority
+    rank, then SLA deadline, then age. Served by the partial
+    `ix_complaint_assignment_queue` index, so only open rows are read.
+    """
+    return (
+        db.query(
+            models.ComplaintAssignment,
+            models.Complaint,
+            models.Priorities.level,
+            sla_deadline().label("sla_due_at"),
+        )
+        .join(
+            models.Complaint,
+            models.Complaint.id == models.ComplaintAssignment.complaint_id,
+        )
+        .join(models.Priorities, models.Priorities.id == models.Complaint.priority_id)
+        .filter(models.ComplaintAssignment.staff_id == staff_id)
+        .filter(models.ComplaintAssignment.status != "resolved")
+        .order_by(
+            models.Priorities.rank,
+            sla_deadline().asc().nulls_last(),
+            models.Complaint.created_at,
+            models.ComplaintAssignment.id,
+        )
+    )
+
+
+def _unleased(now: datetime):
+    return or_(
+        models.ComplaintAssignment.leased_until.is_(None),
+        models.ComplaintAssignment.leased_until < now,
+    )
+
+
+def _item(row) -> schemas.QueueItem:
+    assignment, complaint, priority_level, sla_due_at = row
+    return schemas.QueueItem(
+        complaint_id=complaint.id,
+        title=complaint.title,
+        description=complaint.description,
+        status=complaint.status,
+        priority_id=complaint.priority_id,
+        priority_level=priority_level,
+        created_at=complaint.created_at,
+        sla_due_at=sla_due_at,
+        leased_until=assignment.leased_until,
+    )
+
+
+def peek(db: Session, staff_id: int) -> schemas.QueueItem | None:
+    """Next unclaimed item, without claiming it."""
+    row = (
+        _open_items(db, staff_id).filter(_unleased(datetime.now(timezone.utc))).first()
+    )
+    return _item(row) if row else None
+
+
+def claim(db: Session, staff_id: int) -> schemas.QueueItem | None:
+    """
+    Leases the next unclaimed item for `queue_lease_seconds`. Rows being
+    claimed by a concurrent request are skipped rather than waited on, so
+    two tabs never get the same complaint. An expired lease returns the
+    item to the queue.
+    """
+    now = datetime.now(timezone.utc)
+    row = (
+        _open_items(db, staff_id)
+        .filter(_unleased(now))
+        .with_for_update(skip_locked=True, of=models.ComplaintAssignment)
+        .first()
+    )
+    if not row:
+        return None
+    row[0].leased_until = now + timedelta(seconds=settings.queue_lease_seconds)
+    db.commit()
+    return _item(row)
+
+
+def _leased_assignment(
+    db: Session, staff_id: int, complaint_id: str
+) -> models.ComplaintAssignment | None:
+    return (
+        db.query(models.ComplaintAssignment)
+        .filter(models.ComplaintAssignment.complaint_id == complaint_id)
+        .filter(models.ComplaintAssignment.staff_id == staff_id)
+        .filter(models.ComplaintAssignment.status != "resolved")
+        .with_for_update()
+        .first()
+    )
+
+
+def renew(db: Session, staff_id: int, complaint_id: str) -> datetime | None:
+    """Extends the lease on an item the staff member is still working on."""
+    assignment = _leased_assignment(db, staff_id, complaint_id)
+    if not assignment:
+        return None
+    assignment.leased_until = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.queue_lease_seconds
+    )
+    db.commit()
+    return assignment.leased_until
+
+
+def release(db: Session, staff_id: int, complaint_id: str) -> bool:
+    """Puts a claimed item back in the queue straight away."""
+    assignment = _leased_assignment(db, staff_id, complaint_id)
+    if not assignment:
+        return False
+    assignment.leased_until = None
+    db.commit()
+    return True
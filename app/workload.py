@@ -0,0 +1,37 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import models, ratings
+
+
+def lock_least_loaded(db: Session, *criteria) -> models.StaffWorkload | None:
+    """
+    Locks the workload row of the least loaded staff member matching
+    `criteria` until the transaction ends. Rows locked by concurrent
+    assignments are skipped, so simultaneous submissions spread over the
+    next candidates instead of piling onto the same person. If every
+    candidate is locked it waits for one instead.
+    """
+    query = (
+        db.query(models.StaffWorkload)
+        .join(models.Staff, models.Staff.id == models.StaffWorkload.staff_id)
+        .filter(*criteria)
+        .order_by(ratings.assignment_order(), models.StaffWorkload.staff_id)
+    )
+    return (
+        query.with_for_update(skip_locked=True, of=models.StaffWorkload).first()
+        or query.with_for_update(of=models.StaffWorkload).first()
+    )
+
+
+def add_open(db: Session, staff_id: int, delta: int):
+    """Adjusts a staff member's open complaint count. The caller commits."""
+    db.query(models.StaffWorkload).filter(
+        models.StaffWorkload.staff_id == staff_id
+    ).update(
+        {
+            "open_complaints": func.greatest(
+                models.StaffWorkload.open_complaints + delta, 0
+            )
+        },
+        synchronize_session=False,
+    )
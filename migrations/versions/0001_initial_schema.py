@@ -0,0 +1,220 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+Databases created by `create_all` before migrations existed already match
+this revision and only need `alembic stamp 0001`.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "roles",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "priorities",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("level", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+    )
+    op.create_table(
+        "complaint_categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+    )
+    op.create_table(
+        "complaint_types",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "category_id", sa.Integer(), sa.ForeignKey("complaint_categories.id")
+        ),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "courses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "students",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("matric_no", sa.String(), nullable=False, unique=True),
+        sa.Column("email", sa.String(), unique=True),
+        sa.Column("password", sa.String()),
+        sa.Column("fullname", sa.String()),
+        sa.Column("department", sa.String(), nullable=False),
+        sa.Column("school", sa.String(), nullable=False),
+        sa.Column("hallname", sa.String()),
+        sa.Column("profile_image", sa.String()),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_table(
+        "staffs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), unique=True),
+        sa.Column("fullname", sa.String(), nullable=False),
+        sa.Column("department", sa.String(), nullable=False),
+        sa.Column("hall_name", sa.String()),
+        sa.Column("password", sa.String()),
+        sa.Column("profile_image", sa.String()),
+        sa.Column(
+            "role_id",
+            sa.Integer(),
+            sa.ForeignKey("roles.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("reports_to", sa.Integer(), sa.ForeignKey("staffs.id")),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_table(
+        "complaints",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column(
+            "student_id",
+            sa.Integer(),
+            sa.ForeignKey("students.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "category_id",
+            sa.Integer(),
+            sa.ForeignKey("complaint_categories.id"),
+            nullable=False,
+        ),
+        sa.Column(
+            "priority_id", sa.Integer(), sa.ForeignKey("priorities.id"), nullable=False
+        ),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("file_url", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column("closed_by", sa.Integer(), sa.ForeignKey("staffs.id")),
+        sa.Column("is_rated", sa.Boolean(), server_default=sa.text("false")),
+    )
+    op.create_table(
+        "complaint_assignment",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "complaint_id",
+            sa.String(),
+            sa.ForeignKey("complaints.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("staff_id", sa.Integer(), sa.ForeignKey("staffs.id"), nullable=False),
+        sa.Column("status", sa.String()),
+        sa.Column("response", sa.String()),
+        sa.Column("internal_notes", sa.String()),
+        sa.Column(
+            "assigned_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column(
+            "updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+        sa.Column("resolved_at", sa.TIMESTAMP(timezone=True)),
+    )
+    op.create_table(
+        "ratings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "complaint_id",
+            sa.String(),
+            sa.ForeignKey("complaints.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("rating", sa.Integer()),
+        sa.Column("feedback", sa.String()),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+    )
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "complaint_id",
+            sa.String(),
+            sa.ForeignKey("complaints.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("message", sa.String(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), server_default=sa.text("false")),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+    )
+    op.create_table(
+        "course_upload_issues",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("level", sa.Integer(), nullable=False),
+        sa.Column(
+            "student_id",
+            sa.Integer(),
+            sa.ForeignKey("students.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "course_id",
+            sa.Integer(),
+            sa.ForeignKey("courses.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("total_units", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()")
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in [
+        "course_upload_issues",
+        "notifications",
+        "ratings",
+        "complaint_assignment",
+        "complaints",
+        "staffs",
+        "students",
+        "courses",
+        "complaint_types",
+        "complaint_categories",
+        "priorities",
+        "roles",
+    ]:
+        op.drop_table(table)
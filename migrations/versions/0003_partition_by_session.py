@@ -0,0 +1,108 @@
+"""range partition complaints, assignments and notifications per session
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00
+
+Postgres can't enforce a unique key on a partitioned table unless it contains
+the partition key, so the primary keys become (id, <partition key>) and the
+foreign keys pointing at `complaints.id` (assignments, ratings, notifications
+and `parent_id`) are dropped. Those links are kept by the application.
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitions import ensure_partitions, session_year
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# * the tables as of this revision, later revisions partition more of them
+PARTITIONED_TABLES = {
+    "complaints": "created_at",
+    "complaint_assignment": "assigned_at",
+    "notifications": "created_at",
+}
+
+SERIAL_TABLES = ["complaint_assignment", "notifications"]
+
+FOREIGN_KEYS = {
+    "complaints": [
+        ("student_id", "students", "CASCADE"),
+        ("category_id", "complaint_categories", None),
+        ("priority_id", "priorities", None),
+        ("closed_by", "staffs", None),
+    ],
+    "complaint_assignment": [("staff_id", "staffs", None)],
+    "notifications": [],
+}
+
+INDEXES = {
+    "complaints": ["student_id", "parent_id"],
+    "complaint_assignment": ["complaint_id", "staff_id"],
+    "notifications": ["user_id"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    connection = op.get_bind()
+
+    first_year = session_year(datetime.now(timezone.utc))
+    for table, key in PARTITIONED_TABLES.items():
+        oldest = connection.execute(sa.text(f"SELECT min({key}) FROM {table}")).scalar()
+        if oldest:
+            first_year = min(first_year, session_year(oldest))
+
+    for table, key in PARTITIONED_TABLES.items():
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        op.execute(
+            f"ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey "
+            f"TO {table}_legacy_pkey"
+        )
+        op.execute(f"UPDATE {table}_legacy SET {key} = now() WHERE {key} IS NULL")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {table}_legacy INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({key})"
+        )
+        op.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {key})")
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    ensure_partitions(
+        connection,
+        first_year,
+        session_year(datetime.now(timezone.utc)) + 1,
+        PARTITIONED_TABLES,
+    )
+
+    for table in PARTITIONED_TABLES:
+        op.execute(f"INSERT INTO {table} SELECT * FROM {table}_legacy")
+        for column, referenced, ondelete in FOREIGN_KEYS[table]:
+            op.create_foreign_key(
+                f"{table}_{column}_fkey",
+                table,
+                referenced,
+                [column],
+                ["id"],
+                ondelete=ondelete,
+            )
+        for column in INDEXES[table]:
+            op.create_index(f"ix_{table}_{column}", table, [column])
+
+    for table in SERIAL_TABLES:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    for table in PARTITIONED_TABLES:
+        op.execute(f"DROP TABLE {table}_legacy CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    raise NotImplementedError("Partitioning can't be undone automatically")
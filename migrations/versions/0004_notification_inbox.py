@@ -0,0 +1,50 @@
+"""notification inbox and unread counters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "notifications",
+        sa.Column("user_type", sa.String(), nullable=False, server_default="staff"),
+    )
+    op.drop_index("ix_notifications_user_id", table_name="notifications")
+    op.create_index(
+        "ix_notifications_inbox", "notifications", ["user_type", "user_id", "id"]
+    )
+    op.create_table(
+        "notification_counters",
+        sa.Column("user_type", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("unread", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.PrimaryKeyConstraint("user_type", "user_id"),
+    )
+    op.execute(
+        "INSERT INTO notification_counters (user_type, user_id, unread) "
+        "SELECT user_type, user_id, count(*) FROM notifications "
+        "WHERE NOT is_read GROUP BY user_type, user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("notification_counters")
+    op.drop_index("ix_notifications_inbox", table_name="notifications")
+    op.create_index("ix_notifications_user_id", "notifications", ["user_id"])
+    op.drop_column("notifications", "user_type")
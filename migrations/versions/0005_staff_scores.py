@@ -0,0 +1,60 @@
+"""running rating aggregates per staff member
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "staff_scores",
+        sa.Column("staff_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "rating_count", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+        sa.Column(
+            "rating_sum", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+        sa.Column("mean", sa.Float(), server_default=sa.text("0"), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["staff_id"], ["staffs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("staff_id"),
+    )
+    op.execute(
+        sa.text(
+            "INSERT INTO staff_scores (staff_id, rating_count, rating_sum, mean, score) "
+            "SELECT a.staff_id, count(*), sum(r.rating), avg(r.rating), "
+            "(:weight * :mean + sum(r.rating)) / (:weight + count(*)) "
+            "FROM ratings r JOIN complaint_assignment a ON a.complaint_id = r.complaint_id "
+            "WHERE r.rating IS NOT NULL GROUP BY a.staff_id"
+        ).bindparams(
+            weight=settings.rating_prior_weight, mean=settings.rating_prior_mean
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("staff_scores")
@@ -0,0 +1,43 @@
+"""per-staff open complaint counter used as the assignment lock
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "staff_workload",
+        sa.Column("staff_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "open_complaints", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["staff_id"], ["staffs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("staff_id"),
+    )
+    op.execute(
+        "INSERT INTO staff_workload (staff_id, open_complaints) "
+        "SELECT s.id, count(a.id) FROM staffs s "
+        "LEFT JOIN complaint_assignment a "
+        "ON a.staff_id = s.id AND a.status <> 'resolved' "
+        "GROUP BY s.id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("staff_workload")
@@ -0,0 +1,85 @@
+"""append-only complaint event log and its resolution stats projection
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.partitions import ensure_partitions, session_year
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE TABLE complaint_events ("
+        "id BIGSERIAL NOT NULL, "
+        "complaint_id VARCHAR NOT NULL, "
+        "event_type SMALLINT NOT NULL, "
+        "actor_type SMALLINT NOT NULL, "
+        "actor_id INTEGER, "
+        "staff_id INTEGER, "
+        "value INTEGER, "
+        "detail VARCHAR, "
+        "created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(), "
+        "PRIMARY KEY (id, created_at)"
+        ") PARTITION BY RANGE (created_at)"
+    )
+    op.execute(
+        "CREATE TABLE complaint_events_default PARTITION OF complaint_events DEFAULT"
+    )
+    current = session_year(datetime.now(timezone.utc))
+    ensure_partitions(
+        op.get_bind(), current, current + 1, {"complaint_events": "created_at"}
+    )
+    op.create_index(
+        "ix_complaint_events_timeline", "complaint_events", ["complaint_id", "id"]
+    )
+
+    op.create_table(
+        "staff_resolution_stats",
+        sa.Column("staff_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "resolved_count", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+        sa.Column(
+            "total_resolution_seconds",
+            sa.BigInteger(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("staff_id"),
+    )
+    op.execute(
+        "INSERT INTO staff_resolution_stats "
+        "(staff_id, resolved_count, total_resolution_seconds) "
+        "SELECT c.closed_by, count(*), "
+        "sum(extract(epoch FROM a.resolved_at - c.created_at))::bigint "
+        "FROM complaints c JOIN complaint_assignment a ON a.complaint_id = c.id "
+        "WHERE c.closed_by IS NOT NULL AND a.resolved_at IS NOT NULL "
+        "GROUP BY c.closed_by"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("staff_resolution_stats")
+    op.execute("DROP TABLE complaint_events CASCADE")
@@ -0,0 +1,58 @@
+"""priority ranks, SLAs and leases for the staff work queue
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "priorities",
+        sa.Column(
+            "rank", sa.SmallInteger(), server_default=sa.text("2"), nullable=False
+        ),
+    )
+    op.add_column("priorities", sa.Column("sla_hours", sa.Integer()))
+    # * best guess from the level names, adjust per deployment
+    op.execute(
+        "UPDATE priorities SET "
+        "rank = CASE lower(level) "
+        "WHEN 'critical' THEN 0 WHEN 'urgent' THEN 0 "
+        "WHEN 'high' THEN 1 WHEN 'medium' THEN 2 WHEN 'low' THEN 3 ELSE 2 END, "
+        "sla_hours = CASE lower(level) "
+        "WHEN 'critical' THEN 4 WHEN 'urgent' THEN 4 "
+        "WHEN 'high' THEN 24 WHEN 'medium' THEN 72 WHEN 'low' THEN 168 END"
+    )
+
+    op.add_column(
+        "complaint_assignment",
+        sa.Column("leased_until", sa.TIMESTAMP(timezone=True)),
+    )
+    op.create_index(
+        "ix_complaint_assignment_queue",
+        "complaint_assignment",
+        ["staff_id", "leased_until"],
+        postgresql_where=sa.text("status <> 'resolved'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_complaint_assignment_queue", table_name="complaint_assignment")
+    op.drop_column("complaint_assignment", "leased_until")
+    op.drop_column("priorities", "sla_hours")
+    op.drop_column("priorities", "rank")
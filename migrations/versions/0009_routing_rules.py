@@ -0,0 +1,57 @@
+"""routing rules deciding which staff receive new complaints
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00
+
+The seed rules reproduce the routing that used to be hard-coded: hall
+complaints (category 1) go to role 4 in the student's hall, department
+complaints (category 2) to role 5 in the student's department, each falling
+back to the role anywhere, and everything else to role 6.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "routing_rules",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer()),
+        sa.Column("role_id", sa.Integer(), nullable=False),
+        sa.Column("scope", sa.String(), server_default="any", nullable=False),
+        sa.Column("position", sa.SmallInteger(), nullable=False),
+        sa.CheckConstraint(
+            "scope IN ('any', 'hall', 'department')", name="routing_rules_scope_check"
+        ),
+        sa.ForeignKeyConstraint(["category_id"], ["complaint_categories.id"]),
+        sa.ForeignKeyConstraint(["role_id"], ["roles.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # * skipped where the role or category doesn't exist in this database
+    op.execute(
+        "INSERT INTO routing_rules (category_id, role_id, scope, position) "
+        "SELECT r.category_id, r.role_id, r.scope, r.position FROM (VALUES "
+        "(1, 4, 'hall', 0), (1, 4, 'any', 1), "
+        "(2, 5, 'department', 0), (2, 5, 'any', 1), "
+        "(NULL::integer, 6, 'any', 0)"
+        ") AS r (category_id, role_id, scope, position) "
+        "WHERE EXISTS (SELECT 1 FROM roles WHERE roles.id = r.role_id) "
+        "AND (r.category_id IS NULL OR EXISTS "
+        "(SELECT 1 FROM complaint_categories c WHERE c.id = r.category_id))"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("routing_rules")
@@ -0,0 +1,43 @@
+"""shared token revocations
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+    op.create_table(
+        "token_cutoffs",
+        sa.Column("user_type", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("not_before", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_type", "user_id"),
+    )
+    op.create_index("ix_token_cutoffs_not_before", "token_cutoffs", ["not_before"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("token_cutoffs")
+    op.drop_table("revoked_tokens")
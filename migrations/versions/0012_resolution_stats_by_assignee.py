@@ -0,0 +1,42 @@
+"""attribute resolution stats to the assigned staff
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 00:00:00
+
+The stats were keyed by whoever closed the complaint. They are rebuilt from
+the assignments, keyed by the staff member each complaint was assigned to.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+REBUILD = (
+    "INSERT INTO staff_resolution_stats "
+    "(staff_id, resolved_count, total_resolution_seconds) "
+    "SELECT {staff}, count(*), "
+    "sum(extract(epoch FROM a.resolved_at - c.created_at))::bigint "
+    "FROM complaints c JOIN complaint_assignment a ON a.complaint_id = c.id "
+    "WHERE {staff} IS NOT NULL AND a.status = 'resolved' "
+    "AND a.resolved_at IS NOT NULL "
+    "GROUP BY {staff}"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DELETE FROM staff_resolution_stats")
+    op.execute(REBUILD.format(staff="a.staff_id"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM staff_resolution_stats")
+    op.execute(REBUILD.format(staff="c.closed_by"))
@@ -0,0 +1,49 @@
+"""duplicates no longer hold an assignment of their own
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:00
+
+Open duplicates are resolved with their parent, so their assignment rows only
+inflated the staff member's open count and showed up in the work queue and
+staff lists. The open ones are dropped and the open counts recomputed.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RECOUNT = (
+    "UPDATE staff_workload w SET open_complaints = ("
+    "SELECT count(*) FROM complaint_assignment a "
+    "WHERE a.staff_id = w.staff_id AND a.status <> 'resolved')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "DELETE FROM complaint_assignment a USING complaints c "
+        "WHERE a.complaint_id = c.id AND c.parent_id IS NOT NULL "
+        "AND a.status <> 'resolved'"
+    )
+    op.execute(RECOUNT)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "INSERT INTO complaint_assignment (complaint_id, staff_id, status) "
+        "SELECT c.id, p.staff_id, 'assigned' FROM complaints c "
+        "JOIN complaint_assignment p ON p.complaint_id = c.parent_id "
+        "WHERE c.status <> 'resolved' AND p.status <> 'resolved' "
+        "AND NOT EXISTS (SELECT 1 FROM complaint_assignment a "
+        "WHERE a.complaint_id = c.id)"
+    )
+    op.execute(RECOUNT)
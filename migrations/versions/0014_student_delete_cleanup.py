@@ -0,0 +1,80 @@
+"""clean up a deleted student's complaint rows
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 00:00:00
+
+Deleting a student still cascades to their complaints, but 0003 dropped the
+foreign keys that took the assignments, ratings, notifications and events of
+those complaints with them. A trigger on students deletes them explicitly,
+and gives back the open workload and unread counts they held.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE FUNCTION delete_student_complaint_rows() RETURNS trigger AS $$
+        BEGIN
+            UPDATE notification_counters c
+            SET unread = greatest(c.unread - n.unread, 0)
+            FROM (
+                SELECT user_type, user_id, count(*) AS unread
+                FROM notifications
+                WHERE is_read IS NOT TRUE AND complaint_id IN (
+                    SELECT id FROM complaints WHERE student_id = OLD.id
+                )
+                GROUP BY user_type, user_id
+            ) n
+            WHERE c.user_type = n.user_type AND c.user_id = n.user_id;
+
+            UPDATE staff_workload w
+            SET open_complaints = greatest(w.open_complaints - a.open, 0)
+            FROM (
+                SELECT staff_id, count(*) AS open
+                FROM complaint_assignment
+                WHERE status <> 'resolved' AND complaint_id IN (
+                    SELECT id FROM complaints WHERE student_id = OLD.id
+                )
+                GROUP BY staff_id
+            ) a
+            WHERE w.staff_id = a.staff_id;
+
+            DELETE FROM notifications WHERE complaint_id IN (
+                SELECT id FROM complaints WHERE student_id = OLD.id
+            );
+            DELETE FROM ratings WHERE complaint_id IN (
+                SELECT id FROM complaints WHERE student_id = OLD.id
+            );
+            DELETE FROM complaint_events WHERE complaint_id IN (
+                SELECT id FROM complaints WHERE student_id = OLD.id
+            );
+            DELETE FROM complaint_assignment WHERE complaint_id IN (
+                SELECT id FROM complaints WHERE student_id = OLD.id
+            );
+            DELETE FROM notification_counters
+            WHERE user_type = 'student' AND user_id = OLD.id;
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute(
+        "CREATE TRIGGER students_delete_complaint_rows BEFORE DELETE ON students "
+        "FOR EACH ROW EXECUTE FUNCTION delete_student_complaint_rows()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER students_delete_complaint_rows ON students")
+    op.execute("DROP FUNCTION delete_student_complaint_rows()")
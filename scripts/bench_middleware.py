@@ -0,0 +1,119 @@
+"""
+Compares the per-request overhead of the old BaseHTTPMiddleware COOP stack
+with SecurityHeadersMiddleware by driving a bare ASGI app in-process, so
+network and server costs don't hide the difference.
+
+    python -m scripts.bench_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from app.middleware import SecurityHeadersMiddleware
+
+HEADERS = {
+    "Cross-Origin-Opener-Policy": "same-origin-allow-popups",
+    "Cross-Origin-Embedder-Policy": "require-corp",
+}
+
+
+class COOPMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware version SecurityHeadersMiddleware replaced."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["Cross-Origin-Opener-Policy"] = "same-origin-allow-popups"
+        response.headers["Cross-Origin-Embedder-Policy"] = "require-corp"
+        return response
+
+
+async def plain(request):
+    return PlainTextResponse("ok")
+
+
+async def streaming(request):
+    async def chunks():
+        for _ in range(16):
+            yield b"x" * 1024
+
+    return StreamingResponse(chunks())
+
+
+ROUTES = [Route("/plain", plain), Route("/stream", streaming)]
+
+
+def build(middleware: Middleware | None) -> Starlette:
+    return Starlette(routes=ROUTES, middleware=[middleware] if middleware else [])
+
+
+async def drive(app, path: str, requests: int) -> float:
+    """Seconds per request, averaged over `requests` sequential calls."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def call():
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # * the client stays connected until the response is done
+                await asyncio.Future()
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(min(requests, 1000)):  # warm-up
+        await call()
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call()
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    stacks = {
+        "none": build(None),
+        "BaseHTTPMiddleware": build(Middleware(COOPMiddleware)),
+        "SecurityHeadersMiddleware": build(
+            Middleware(SecurityHeadersMiddleware, headers=HEADERS)
+        ),
+    }
+    for path in ("/plain", "/stream"):
+        baseline = None
+        for name, app in stacks.items():
+            seconds = asyncio.run(drive(app, path, args.requests))
+            baseline = baseline if baseline is not None else seconds
+            print(
+                f"{path:8} {name:26} {seconds * 1e6:8.1f} us/request "
+                f"(+{(seconds - baseline) * 1e6:.1f} us over no middleware)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Times `import app.main` in fresh interpreters, which is what every worker
+pays on startup, and lists the slowest modules from `-X importtime`. Settings
+come from the environment or `.env` as usual.
+
+    python -m scripts.time_import --runs 5 --top 15
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_import(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app.main"], check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_modules(top: int) -> list[tuple[int, str]]:
+    """Cumulative microseconds per module, as reported by `-X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        # * import time: self [us] | cumulative | imported package
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        modules.append((int(fields[1]), fields[2].rstrip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = time_import(args.runs)
+    print(
+        f"import app.main: median {statistics.median(timings) * 1000:.0f}ms, "
+        f"min {min(timings) * 1000:.0f}ms over {args.runs} runs "
+        "(includes interpreter startup)"
+    )
+    print(f"\nslowest {args.top} imports (cumulative):")
+    for microseconds, module in slowest_modules(args.top):
+        print(f"{microseconds / 1000:8.1f}ms {module}")
+
+
+if __name__ == "__main__":
+    main()
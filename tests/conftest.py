@@ -0,0 +1,46 @@
+import os
+import pytest
+
+# * placeholder settings so app.config loads without a .env file, tests that
+# * need a real database read TEST_DATABASE_* instead
+for name, value in {
+    "DATABASE_HOSTNAME": os.environ.get("TEST_DATABASE_HOSTNAME", "localhost"),
+    "DATABASE_PORT": os.environ.get("TEST_DATABASE_PORT", "5432"),
+    "DATABASE_PASSWORD": os.environ.get("TEST_DATABASE_PASSWORD", "postgres"),
+    "DATABASE_NAME": os.environ.get("TEST_DATABASE_NAME", "complaints_test"),
+    "DATABASE_USERNAME": os.environ.get("TEST_DATABASE_USERNAME", "postgres"),
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRATION_MINUTES": "15",
+    "GOOGLE_CLIENT_ID": "test-client-id",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "CLOUDINARY_CLOUD_NAME": "test",
+    "CLOUDINARY_API_KEY": "test",
+    "CLOUDINARY_SECRET_KEY": "test",
+    "MAILGUN_API_KEY": "test",
+    "NOVU_SECRET_KEY": "test",
+    "GEMINI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture(scope="session")
+def postgres():
+    """The migrated test database, tests using it are skipped without one."""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.database import engine
+
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("Postgres is not reachable, set TEST_DATABASE_*")
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(root, "migrations"))
+    command.upgrade(config, "head")
+    return engine
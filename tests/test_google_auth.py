@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+from google.oauth2 import id_token
+from app import google_auth
+from app.config import settings
+
+KID = "test-kid"
+
+
+def _signing_material():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "stub-google")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+PRIVATE_PEM, CERT_PEM = _signing_material()
+
+
+def make_token(email: str) -> str:
+    now = int(time.time())
+    signer = crypt.RSASigner.from_string(PRIVATE_PEM, key_id=KID)
+    return google_jwt.encode(
+        signer,
+        {
+            "iss": "https://accounts.google.com",
+            "aud": settings.google_client_id,
+            "sub": email,
+            "email": email,
+            "email_verified": True,
+            "iat": now,
+            "exp": now + 600,
+        },
+    ).decode()
+
+
+@pytest.fixture
+def cert_server(monkeypatch):
+    """Stub of Google's cert endpoint that counts how often it's fetched."""
+    state = {"hits": 0, "cache_control": "public, max-age=3600"}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["hits"] += 1
+            body = json.dumps({KID: CERT_PEM}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", state["cache_control"])
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(
+        id_token,
+        "_GOOGLE_OAUTH2_CERTS_URL",
+        f"http://127.0.0.1:{server.server_address[1]}/oauth2/v1/certs",
+    )
+    monkeypatch.setattr(google_auth, "google_request", google_auth.CachingRequest())
+    google_auth._verified_tokens.clear()
+    yield state
+    server.shutdown()
+
+
+def test_certs_fetched_once_within_max_age(cert_server):
+    # * distinct tokens, so it's the cert cache and not the claims cache
+    for email in ("a@example.com", "b@example.com", "c@example.com"):
+        idinfo = google_auth.verify_google_token(make_token(email))
+        assert idinfo["email"] == email
+
+    assert cert_server["hits"] == 1
+
+
+def test_certs_refetched_without_max_age(cert_server):
+    cert_server["cache_control"] = "no-cache, no-store"
+
+    for email in ("a@example.com", "b@example.com"):
+        google_auth.verify_google_token(make_token(email))
+
+    assert cert_server["hits"] == 2
+
+
+def test_repeated_token_served_from_claims_cache(cert_server):
+    token = make_token("a@example.com")
+    google_auth.verify_google_token(token)
+    google_auth.google_request._cache.clear()
+
+    google_auth.verify_google_token(token)
+
+    assert cert_server["hits"] == 1
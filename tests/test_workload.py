@@ -0,0 +1,98 @@
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app import models, routing, schemas
+from app.categorization import HALL
+from app.database import SessionLocal
+from app.routers import complaints
+
+HALL_NAME = "Test Hall"
+PORTER_ROLE_ID = 4
+STAFF_COUNT = 4
+SUBMISSIONS = 40
+
+
+def _seed(db):
+    # * cascades to staff, workload, complaints and everything hanging off them
+    db.execute(
+        text(
+            "TRUNCATE roles, complaint_categories, priorities, students "
+            "RESTART IDENTITY CASCADE"
+        )
+    )
+    db.add(models.Role(id=PORTER_ROLE_ID, name="hporter"))
+    db.add(models.ComplaintCategory(id=HALL, name="Hall"))
+    db.add(models.Priorities(id=1, level="low"))
+    db.flush()
+    db.add(
+        models.RoutingRule(
+            category_id=HALL, role_id=PORTER_ROLE_ID, scope="hall", position=0
+        )
+    )
+    for index in range(STAFF_COUNT):
+        staff = models.Staff(
+            email=f"porter{index}@example.com",
+            fullname=f"Porter {index}",
+            department="Hall",
+            hall_name=HALL_NAME,
+            role_id=PORTER_ROLE_ID,
+        )
+        db.add(staff)
+        db.flush()
+        db.add(models.StaffWorkload(staff_id=staff.id, open_complaints=0))
+    students = []
+    for index in range(SUBMISSIONS):
+        student = models.Student(
+            matric_no=f"TEST/{index}",
+            email=f"student{index}@example.com",
+            department="Computer Science",
+            school="Computing",
+            hallname=HALL_NAME,
+        )
+        db.add(student)
+        students.append(student)
+    db.commit()
+    routing.table.invalidate()
+    return [
+        schemas.StudentPrincipal(
+            id=student.id,
+            email=student.email,
+            department=student.department,
+            hallname=student.hallname,
+        )
+        for student in students
+    ]
+
+
+def _submit(student: schemas.StudentPrincipal):
+    db = SessionLocal()
+    try:
+        # * unrelated random text so no submission is linked as a duplicate
+        words = [uuid.uuid4().hex for _ in range(6)]
+        complaints.create_complaint(words[0], " ".join(words[1:]), HALL, 1, student, db)
+    finally:
+        db.close()
+
+
+def test_parallel_submissions_spread_evenly(postgres):
+    db = SessionLocal()
+    try:
+        students = _seed(db)
+
+        with ThreadPoolExecutor(max_workers=SUBMISSIONS) as pool:
+            list(pool.map(_submit, students))
+
+        workloads = {
+            row.staff_id: row.open_complaints for row in db.query(models.StaffWorkload)
+        }
+        assigned = Counter(
+            staff_id for (staff_id,) in db.query(models.ComplaintAssignment.staff_id)
+        )
+    finally:
+        db.close()
+
+    assert sum(assigned.values()) == SUBMISSIONS
+    # * the counters match the assignments and no one got more than their share
+    assert workloads == {staff_id: assigned[staff_id] for staff_id in workloads}
+    assert max(workloads.values()) - min(workloads.values()) <= 1